@@ -1,14 +1,127 @@
 import os
 import re
+import sys
 import json
 import time
-import math
-from bs4 import BeautifulSoup
+import hashlib
+import logging
+import bisect
+from functools import lru_cache
+import numpy as np
+import soupsieve as sv
+from bs4 import BeautifulSoup, SoupStrainer
 from typing import Any
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import threading
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.driver_finder import DriverFinder
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 from code.printf import printf
 
+# 逐节点的诊断信息走 logging，默认级别下不会格式化消息，也不会产生输出
+logger = logging.getLogger(__name__)
+
+# 预编译热点路径中使用的正则表达式
+_FLOWCHART_ID_RE = re.compile(r'flowchart-([^-]+)(-\d+)?$')
+_TRANSLATE_RE = re.compile(r'translate\(([\d.]+),\s*([\d.]+)\)')
+_NUM_SUFFIX_RE = re.compile(r'_\d+$')
+_PATH_POINTS_RE = re.compile(r'([A-Za-z])\s*([\d\.]+)[,\s]*([\d\.]+)')
+_LINK_RE = re.compile(r'#L(\d+)(?:-L(\d+))?$')
+_SQL_RE = re.compile(r'\b(SELECT|INSERT|UPDATE|DELETE|CREATE|ALTER|DROP)\b', re.I)
+_YAML_RE = re.compile(r'^\s*\w+:\s*')
+_BLANKS_RE = re.compile(r'\n{3,}')
+_STATE_TRANSLATE_RE = re.compile(r'translate\(([^,]+),\s*([^)]+)')
+_PATH_CMD_RE = re.compile(r'([MLC])([\d.,-]+)')
+_PATH_NUM_RE = re.compile(r'[-+]?\d*\.\d+|[-+]?\d+')
+
+# 预编译 CSS 选择器，避免每次调用 select 时重新解析选择器字符串
+_SEL_NODE = sv.compile('g.node.default')
+_SEL_CLUSTER = sv.compile('g.cluster')
+_SEL_LINK = sv.compile('path.flowchart-link')
+_SEL_MERMAID_SVG = sv.compile('svg[id^="mermaid-"]')
+_SEL_SKIPPED = sv.compile(
+    '[style*="display: none"], [style*="visibility: hidden"], '
+    'button, script, style, noscript, iframe, header, footer'
+)
+
+# HTML 解析器会把 foreignObject 标签名转为小写，按名称查找时两种写法都要匹配
+_FOREIGN_OBJECT_TAGS = ['foreignObject', 'foreignobject']
+
+# 只为侧边栏目录和正文容器建树，页面其余部分在解析时直接丢弃
+_SIDEBAR_STRAINER = SoupStrainer('div', attrs={'class': re.compile(r'border-r-border')})
+_CONTENT_STRAINER = SoupStrainer('div', attrs={'class': re.compile(r'container|prose')})
+# 序列图只用到参与者分组、文本和消息线，传入字符串时只为这些标签建树
+_SEQUENCE_STRAINER = SoupStrainer(['g', 'text', 'line', 'path', 'rect'])
+
+# 代码语言识别规则（按优先级排列）：(语言, 单词关键字, 需要按子串匹配的短语)
+_LANGUAGE_RULES = (
+    ('javascript', frozenset(['function', 'const', 'let', 'var']), ()),
+    ('python', frozenset(['def', 'import', 'from']), ('print(',)),
+    ('java', frozenset(['private']), ('public class ', 'public static void main')),
+    ('csharp', frozenset(['namespace']), ('using System',)),
+    ('c', frozenset(), ('#include', 'int main')),
+    ('go', frozenset(['package', 'func']), ()),
+    ('rust', frozenset(['fn']), ('let mut',)),
+)
+
+# 等待页面元素出现的最长时间（秒）
+_PAGE_LOAD_TIMEOUT = 10
+
+# 正文中的 Mermaid 图表是否都已在浏览器中渲染为 SVG：还剩下 Mermaid 源码的 <pre> 时返回 false。
+# 按第一行整行匹配图表声明（如 graph TD、sequenceDiagram），graphql、graph = build() 之类的普通代码不算
+_MERMAID_RENDERED_JS = r"""
+return !Array.from(document.querySelectorAll('.container pre')).some(function (pre) {
+    if (pre.querySelector('svg')) return false;
+    var code = pre.querySelector('code');
+    if (/mermaid/.test(pre.className + ' ' + (code ? code.className : ''))) return true;
+    var firstLine = pre.textContent.trim().split('\n')[0].trim();
+    return /^(?:(?:graph|flowchart)\s+(?:TB|TD|BT|RL|LR)|sequenceDiagram|(?:class|state)Diagram(?:-v2)?)\s*;?$/.test(firstLine);
+});
+"""
+
+# 并发抓取页面时使用的浏览器实例数量上限
+_MAX_WORKERS = 4
+
+# 转换页面的进程数量上限：转换速度受抓取速度限制，进程再多也只是空等
+_MAX_CONVERT_WORKERS = min(_MAX_WORKERS, os.cpu_count() or 1)
+
+# 每个工作线程持有自己的浏览器实例
+_thread_local = threading.local()
+
+# 表格的分组标签和单元格标签
+_TABLE_SECTION_TAGS = frozenset(['thead', 'tbody', 'tfoot'])
+_TABLE_CELL_TAGS = frozenset(['th', 'td'])
+
+# process_node 显式栈中的任务类型
+_ENTER, _LEAVE, _ITEM, _ITEM_END, _SPLIT = range(5)
+
+# 图表转换结果在同一个转换进程内跨页面共享：同一张图经常出现在多个页面中，只是 SVG 的 mermaid-xxx ID 不同
+_DIAGRAM_CACHE_MAX_SIZE = 512
+_diagram_cache = {}
+
+# 文件名中的非法字符（含控制字符）统一替换为下划线，str.translate 比正则替换快得多
+_SANITIZE_TABLE = dict.fromkeys([*map(ord, '<>:"/\\|?*'), *range(0x20)], '_')
+
+def _extract_label_text(label) -> str:
+    """
+    提取流程图节点或集群标签的文本。按标签名逐级查找 foreignObject > div，不经过 CSS 选择器引擎
+
+    Parameters:
+        label (Tag): 节点的 .label 或集群的 .cluster-label 元素
+
+    Returns:
+        str: 标签文本，双引号替换为单引号以便写入 Mermaid
+    """
+    foreign = label.find(_FOREIGN_OBJECT_TAGS)
+    div = foreign.find('div') if foreign else None
+    return (div or label).get_text(strip=True).replace('"', "'")
+
 def convert_flowchart_svg_to_mermaid_text(svg_content):
     """
     将流程图 SVG 转换为 Mermaid 文本
@@ -20,49 +133,61 @@ def convert_flowchart_svg_to_mermaid_text(svg_content):
         str: 转换后的 Mermaid 文本
     """
     try:
-        # 1. 提取所有节点
+        # 1. 提取所有节点：一次遍历同时取得节点文本和坐标
         nodes = {}
-        id_map = {}
-        for node in svg_content.select('g.node.default'):
+        parsed_nodes = []
+        for node in _SEL_NODE.select(svg_content):
             original_id = node.get('id', '')
             if not original_id.startswith('flowchart-'):
                 continue
                 
-            base_id = re.sub(r'flowchart-([^-]+)(-\d+)?$', r'\1', original_id)
+            # 节点 ID 在后续的字典和集合查找中反复使用，驻留后比较只需比较指针
+            base_id = sys.intern(_FLOWCHART_ID_RE.sub(r'\1', original_id))
             
             # 提取节点文本
-            label = node.select_one('.label')
-            text = ''
-            if label:
-                foreign = label.select_one('foreignObject div')
-                if foreign:
-                    text = foreign.get_text(strip=True).replace('"', "'")
-                else:
-                    text = label.get_text(strip=True).replace('"', "'")
-            
-            nodes[base_id] = text
-            id_map[original_id] = base_id
+            label = node.find(class_='label')
+            nodes[base_id] = _extract_label_text(label) if label else ''
+
+            # 记录节点坐标，用于分配到集群
+            node_transform = node.get('transform', '')
+            if not node_transform.startswith('translate('):
+                continue
+
+            coords = _TRANSLATE_RE.search(node_transform)
+            if not coords:
+                continue
+
+            try:
+                parsed_nodes.append((base_id, float(coords.group(1)), float(coords.group(2))))
+            except ValueError:
+                continue
 
         # 2. 精确构建集群层级结构
-        clusters = {}
+        # 集群数据按 SoA 形式存放：以整数下标对齐的几个并列列表，矩形坐标汇总为一个 (C, 4) 数组
+        cluster_ids = []
+        cluster_titles = []
+        cluster_rects = []
+        id_to_idx = {}
         
         # 首先收集所有集群
-        all_clusters = list(svg_content.select('g.cluster'))
+        all_clusters = _SEL_CLUSTER.select(svg_content)
         for cluster in all_clusters:
-            cluster_id = cluster.get('id', f'cluster_{len(clusters)+1}')
+            cluster_id = cluster.get('id', f'cluster_{len(cluster_ids)+1}')
             
+            # 矩形和标题通常是集群的直接子节点，一次遍历子节点即可取到，找不到时再向下搜索
+            rect = label = None
+            for child in cluster.children:
+                if child.name == 'rect':
+                    rect = rect or child
+                elif child.name and 'cluster-label' in child.get('class', ()):
+                    label = label or child
+            rect = rect or cluster.find('rect')
+            label = label or cluster.find(class_='cluster-label')
+
             # 提取集群标题
-            label = cluster.select_one('.cluster-label')
-            title = "Untitled Cluster"
-            if label:
-                foreign = label.select_one('foreignObject div')
-                if foreign:
-                    title = foreign.get_text(strip=True).replace('"', "'")
-                else:
-                    title = label.get_text(strip=True).replace('"', "'")
+            title = _extract_label_text(label) if label else "Untitled Cluster"
             
             # 获取集群边界
-            rect = cluster.select_one('rect')
             if not rect:
                 continue
                 
@@ -74,159 +199,122 @@ def convert_flowchart_svg_to_mermaid_text(svg_content):
             except (ValueError, AttributeError):
                 continue
             
-            clusters[cluster_id] = {
-                'title': title,
-                'nodes': [],
-                'children': [],
-                'rect': (x, y, x + width, y + height),
-                'element': cluster
-            }
+            # 重复的集群 ID 沿用首次出现的位置，数据以最后一次为准
+            idx = id_to_idx.setdefault(cluster_id, len(cluster_ids))
+            if idx == len(cluster_ids):
+                cluster_ids.append(cluster_id)
+                cluster_titles.append(title)
+                cluster_rects.append((x, y, x + width, y + height))
+            else:
+                cluster_titles[idx] = title
+                cluster_rects[idx] = (x, y, x + width, y + height)
+
+        cluster_count = len(cluster_ids)
+        cluster_nodes = [[] for _ in range(cluster_count)]
+        cluster_children = [[] for _ in range(cluster_count)]
 
         # 3. 确定集群嵌套关系（基于包含关系）
-        cluster_ids = list(clusters.keys())
-        for i in range(len(cluster_ids)):
-            for j in range(len(cluster_ids)):
-                if i == j:
-                    continue
-                    
-                # 检查cluster_i是否完全包含cluster_j
-                (x1_i, y1_i, x2_i, y2_i) = clusters[cluster_ids[i]]['rect']
-                (x1_j, y1_j, x2_j, y2_j) = clusters[cluster_ids[j]]['rect']
-                
-                if (x1_i <= x1_j and y1_i <= y1_j and 
-                    x2_i >= x2_j and y2_i >= y2_j):
-                    # 确保没有更近的父集群
-                    is_direct_child = True
-                    for k in range(len(cluster_ids)):
-                        if k == i or k == j:
-                            continue
-                            
-                        (x1_k, y1_k, x2_k, y2_k) = clusters[cluster_ids[k]]['rect']
-                        if (x1_k <= x1_j and y1_k <= y1_j and 
-                            x2_k >= x2_j and y2_k >= y2_j and
-                            x1_i <= x1_k and y1_i <= y1_k and 
-                            x2_i >= x2_k and y2_i >= y2_k):
-                            is_direct_child = False
-                            break
-                    
-                    if is_direct_child:
-                        clusters[cluster_ids[i]]['children'].append(cluster_ids[j])
-
-        # 4. 分配节点到最内层集群
-        # 按面积从小到大排序（从最内层到最外层）
-        sorted_clusters = sorted(
-            clusters.items(),
-            key=lambda x: (x[1]['rect'][2] - x[1]['rect'][0]) * (x[1]['rect'][3] - x[1]['rect'][1])
-        )
+        # 一次广播比较即可得到完整的包含矩阵
+        x1, y1, x2, y2 = np.array(cluster_rects, dtype=np.float64).reshape(-1, 4).T
 
-        for cluster_id, data in sorted_clusters:
-            (x1, y1, x2, y2) = data['rect']
-            
-            for node in svg_content.select('g.node.default'):
-                node_id = node.get('id', '')
-                if node_id not in id_map:
-                    continue
-                    
-                # 检查节点是否已经在更内层的集群中
-                already_clustered = any(
-                    id_map[node_id] in clusters[c]['nodes'] 
-                    for c in data['children']
-                )
-                
-                if already_clustered:
-                    continue
-                    
-                # 检查坐标是否在当前集群内
-                node_transform = node.get('transform', '')
-                if not node_transform.startswith('translate('):
-                    continue
-                    
-                coords = re.findall(r'translate\(([\d.]+),\s*([\d.]+)\)', node_transform)
-                if not coords:
-                    continue
-                    
-                try:
-                    node_x, node_y = map(float, coords[0])
-                    if x1 <= node_x <= x2 and y1 <= node_y <= y2:
-                        clusters[cluster_id]['nodes'].append(id_map[node_id])
-                except (ValueError, IndexError):
-                    continue
+        # contains[i, j] 表示 cluster_i 完全包含 cluster_j
+        contains = ((x1[:, None] <= x1[None, :]) & (y1[:, None] <= y1[None, :]) &
+                    (x2[:, None] >= x2[None, :]) & (y2[:, None] >= y2[None, :]))
+        np.fill_diagonal(contains, False)
+
+        # 存在 k 使得 i 包含 k 且 k 包含 j 时，i 不是 j 的直接父集群
+        direct = contains & ~(contains @ contains)
+        for i, j in zip(*np.nonzero(direct)):
+            cluster_children[i].append(int(j))
+
+        # 4. 分配节点到最内层集群，同时记录所有已归入集群的节点
+        clustered_nodes = set()
+        # 一次广播比较得到节点与所有集群的包含关系，每个节点只归入面积最小（最内层）的集群
+        if parsed_nodes and cluster_count:
+            count = len(parsed_nodes)
+            node_x = np.fromiter((n[1] for n in parsed_nodes), dtype=np.float64, count=count)
+            node_y = np.fromiter((n[2] for n in parsed_nodes), dtype=np.float64, count=count)
+            inside = ((node_x[:, None] >= x1) & (node_x[:, None] <= x2) &
+                      (node_y[:, None] >= y1) & (node_y[:, None] <= y2))
+            areas = (x2 - x1) * (y2 - y1)
+            innermost = np.where(inside, areas, np.inf).argmin(axis=1)
+            for (base_id, _, _), idx, found in zip(parsed_nodes, innermost, inside.any(axis=1)):
+                if found:
+                    cluster_nodes[idx].append(base_id)
+                    clustered_nodes.add(base_id)
 
         # 5. 边关系解析
-        edges = []
-        for path in svg_content.select('path.flowchart-link'):
+        edges = set()
+        # 去除数字后缀的结果按子串缓存，同一节点名会在很多边 ID 中重复出现
+        stripped = {}
+
+        def strip_suffix(text):
+            if (result := stripped.get(text)) is None:
+                result = stripped[text] = sys.intern(_NUM_SUFFIX_RE.sub('', text))
+            return result
+
+        for path in _SEL_LINK.select(svg_content):
             path_id = path.get('id', '')
             if not path_id.startswith('L_'):
                 continue
-                
-            parts = path_id[2:].split('_')
-            
-            # 处理多种可能的边ID格式
-            if len(parts) >= 2:
-                # 尝试从长到短的各种组合
-                for i in range(1, len(parts)):
-                    source = '_'.join(parts[:i])
-                    target = '_'.join(parts[i:])
-                    
-                    # 去除数字后缀
-                    source = re.sub(r'_\d+$', '', source)
-                    target = re.sub(r'_\d+$', '', target)
-                    
-                    if source in nodes and target in nodes:
-                        edges.append(f"{source} --> {target}")
+
+            edge_id = path_id[2:]
+
+            # 处理多种可能的边ID格式：用 str.find 逐个定位下划线，依次尝试各种 源_目标 组合
+            i = edge_id.find('_')
+            while i != -1:
+                source = strip_suffix(edge_id[:i])
+                if source in nodes:
+                    target = strip_suffix(edge_id[i + 1:])
+                    if target in nodes:
+                        edges.add(f"{source} --> {target}")
                         break
+                i = edge_id.find('_', i + 1)
 
         # 6. 生成Mermaid代码（确保正确嵌套）
         mermaid = ["flowchart TD"]
         
         # 递归添加集群
-        def add_cluster(cluster_id, indent=0):
-            data = clusters[cluster_id]
+        def add_cluster(idx, indent=0):
+            cluster_id = cluster_ids[idx]
             prefix = "    " * indent
             
             # 集群开始
-            title = data['title'] or f"Cluster {cluster_id}"
+            title = cluster_titles[idx] or f"Cluster {cluster_id}"
             mermaid.append(f"{prefix}subgraph {cluster_id}[\"{title}\"]")
             
             # 添加节点
-            for node_id in data['nodes']:
+            for node_id in cluster_nodes[idx]:
                 mermaid.append(f"{prefix}    {node_id}[\"{nodes[node_id]}\"]")
             
             # 递归添加子集群
-            for child_id in data['children']:
-                add_cluster(child_id, indent + 1)
+            for child in cluster_children[idx]:
+                add_cluster(child, indent + 1)
             
             # 集群结束
             mermaid.append(f"{prefix}end")
         
-        # 先添加顶级集群（没有父集群的）
-        top_level_clusters = [
-            cid for cid, data in clusters.items() 
-            if not any(cid in clusters[other]['children'] for other in clusters)
-        ]
+        # 先添加顶级集群（没有父集群的）：直接父子矩阵中某一列全为 False，说明该集群不是任何集群的子集群
+        top_level_clusters = np.flatnonzero(~direct.any(axis=0)).tolist()
         
         # 确保最大的集群（MSR Configuration）在最外层
         main_cluster = None
-        for cid in top_level_clusters:
-            if "MSR Configuration" in clusters[cid]['title']:
-                main_cluster = cid
+        for idx in top_level_clusters:
+            if "MSR Configuration" in cluster_titles[idx]:
+                main_cluster = idx
                 break
                 
-        if main_cluster:
+        if main_cluster is not None:
             add_cluster(main_cluster)
             # 添加其他顶级集群（如果有）
-            for cid in top_level_clusters:
-                if cid != main_cluster:
-                    add_cluster(cid)
+            for idx in top_level_clusters:
+                if idx != main_cluster:
+                    add_cluster(idx)
         else:
-            for cid in top_level_clusters:
-                add_cluster(cid)
+            for idx in top_level_clusters:
+                add_cluster(idx)
         
         # 添加游离节点（不在任何集群中的）
-        clustered_nodes = set()
-        for data in clusters.values():
-            clustered_nodes.update(data['nodes'])
-            
         for node_id, text in nodes.items():
             if node_id not in clustered_nodes:
                 mermaid.append(f"{node_id}[\"{text}\"]")
@@ -234,12 +322,12 @@ def convert_flowchart_svg_to_mermaid_text(svg_content):
         # 添加边关系
         if edges:
             mermaid.append("")
-            mermaid.extend(sorted(set(edges)))
+            mermaid.extend(sorted(edges))
         
         return "```mermaid\n" + "\n".join(mermaid) + "\n```"
     
-    except Exception as e:
-        print(f"转换过程中出错: {str(e)}")
+    except Exception:
+        logger.debug("流程图转换出错", exc_info=True)
         return None
 
 def convert_sequence_svg_to_mermaid_text(svg_content):
@@ -253,61 +341,112 @@ def convert_sequence_svg_to_mermaid_text(svg_content):
         str: mermaid序列图文本
     """
     try:
-        soup = BeautifulSoup(svg_content, 'html.parser') if isinstance(svg_content, str) else svg_content
+        if isinstance(svg_content, str):
+            soup = BeautifulSoup(svg_content, 'lxml', parse_only=_SEQUENCE_STRAINER)
+        else:
+            soup = svg_content
         
         # ===== 1. 提取唯一参与者 =====
         participants = {}  # {actor_name: x_position}
         actor_rects = {}  # 保存参与者矩形元素 {actor_name: rect_element}
         actor_labels = set()  # 保存参与者标签文本元素
         
+        # 一次遍历把参与者矩形、文本和消息线分拣出来，避免对整棵树重复查询
+        actor_rect_elems = []
+        text_elems = []
+        message_elems = []
+        for elem in soup.find_all(['rect', 'text', 'line', 'path']):
+            if elem.name == 'text':
+                text_elems.append(elem)
+                continue
+            classes = ' '.join(elem.get_attribute_list('class', '')).lower()
+            if elem.name == 'rect':
+                if 'actor' in classes and elem.parent.name == 'g':
+                    actor_rect_elems.append(elem)
+            elif 'message' in classes:
+                message_elems.append(elem)
+
         # 先提取所有参与者
-        for g in soup.find_all('g'):
-            if rect := g.find('rect', class_=lambda x: x and 'actor' in x.lower()):
-                if text := (g.find('text', class_='label') or g.find('text')):
-                    try:
-                        x = float(rect.get('x', 0)) + float(rect.get('width', 0)) / 2
-                        actor_name = text.get_text(strip=True)
-                        # 只保留每个参与者的最左侧出现
-                        participants[actor_name] = x
-                        actor_rects[actor_name] = rect
-                        actor_labels.add(text)
-                    except (ValueError, AttributeError):
-                        continue
+        for rect in actor_rect_elems:
+            g = rect.parent
+            if text := (g.find('text', class_='label') or g.find('text')):
+                try:
+                    x = float(rect.get('x', 0)) + float(rect.get('width', 0)) / 2
+                    actor_name = text.get_text(strip=True)
+                    # 只保留每个参与者的最左侧出现
+                    participants[actor_name] = x
+                    actor_rects[actor_name] = rect
+                    actor_labels.add(text)
+                except (ValueError, AttributeError):
+                    continue
         
         if not participants:
             return "错误：未识别到参与者"
 
         # ===== 2. 处理消息线 =====
         elements = []
-        used_texts = set()
+        used_texts = set()  # 已匹配到消息线的文本下标
         
         # 预处理所有非参与者标签的文本元素
         texts = []
-        for text in soup.find_all('text'):
+        for text in text_elems:
             if text not in actor_labels:  # 排除参与者名称文本
                 try:
                     texts.append({
                         'x': float(text.get('x', 0)),
                         'y': float(text.get('y', 0)),
-                        'text': text.get_text(strip=True),
-                        'element': text
+                        'text': text.get_text(strip=True)
                     })
                 except (ValueError, AttributeError):
                     continue
         
-        # 辅助函数：查找最近的参与者
+        # 辅助函数：查找最近的参与者。参与者按 x 坐标排序后二分查找，只需比较左右两个邻居；
+        # 距离相同时与原先的 min() 一致，取先出现的参与者
+        actor_rank = {name: i for i, name in enumerate(participants)}
+        actor_at_x = {}
+        for name, x in participants.items():
+            actor_at_x.setdefault(x, name)
+        actor_xs = sorted(actor_at_x)
         def find_actor(x_pos):
-            return min(participants.items(), key=lambda p: abs(p[1] - x_pos))[0]
+            i = bisect.bisect_left(actor_xs, x_pos)
+            return min(
+                (actor_at_x[x] for x in actor_xs[max(i - 1, 0):i + 1]),
+                key=lambda name: (abs(participants[name] - x_pos), actor_rank[name])
+            )
+        
+        # 辅助函数：查找距离 (mid_x, mid_y) 最近的未使用文本，返回其下标
+        # 文本按 y 坐标排序，从 mid_y 处向两侧扩展，y 距离已超过当前最优得分时即可停止
+        text_order = sorted(range(len(texts)), key=lambda k: texts[k]['y'])
+        text_ys = [texts[k]['y'] for k in text_order]
+        def find_closest_text(mid_x, mid_y):
+            best, best_score = None, float('inf')
+            hi = bisect.bisect_left(text_ys, mid_y)
+            lo = hi - 1
+            while lo >= 0 or hi < len(text_ys):
+                if hi >= len(text_ys) or (lo >= 0 and mid_y - text_ys[lo] <= text_ys[hi] - mid_y):
+                    k, dy = text_order[lo], mid_y - text_ys[lo]
+                    lo -= 1
+                else:
+                    k, dy = text_order[hi], text_ys[hi] - mid_y
+                    hi += 1
+                if dy > best_score:
+                    break
+                if k in used_texts:
+                    continue
+                score = dy + 0.3 * abs(texts[k]['x'] - mid_x)
+                if score < best_score or (score == best_score and k < best):
+                    best, best_score = k, score
+            return best
         
         # 处理消息线
-        for elem in soup.find_all(['line', 'path'], class_=lambda x: x and 'message' in x.lower()):
+        for elem in message_elems:
             try:
                 # 获取坐标
                 if elem.name == 'line':
                     x1, y1 = float(elem.get('x1', 0)), float(elem.get('y1', 0))
                     x2, y2 = float(elem.get('x2', 0)), float(elem.get('y2', 0))
                 else:  # path
-                    points = re.findall(r'([A-Za-z])\s*([\d\.]+)[,\s]*([\d\.]+)', elem.get('d', ''))
+                    points = _PATH_POINTS_RE.findall(elem.get('d', ''))
                     if not points: continue
                     x1, y1 = float(points[0][1]), float(points[0][2])
                     x2, y2 = float(points[-1][1]), float(points[-1][2])
@@ -317,23 +456,22 @@ def convert_sequence_svg_to_mermaid_text(svg_content):
                 
                 # 查找最近的未使用文本（排除参与者标签）
                 mid_y = (y1 + y2) / 2
-                closest_text = min(
-                    (t for t in texts if t['element'] not in used_texts),
-                    key=lambda t: abs(t['y'] - mid_y) + 0.3 * abs(t['x'] - (x1 + x2)/2),
-                    default=None
-                )
+                closest = find_closest_text((x1 + x2) / 2, mid_y)
                 
-                if closest_text:
+                if closest is not None:
+                    closest_text = texts[closest]
                     if sender == receiver:  # 自调用
                         elements.append((mid_y, f"{sender}->>{sender}: {closest_text['text']}"))
                     else:
                         elements.append((mid_y, f"{sender}->>{receiver}: {closest_text['text']}"))
-                    used_texts.add(closest_text['element'])
+                    used_texts.add(closest)
             except Exception:
                 continue
         
         # 处理剩余文本作为注释
-        for text in (t for t in texts if t['element'] not in used_texts):
+        for k, text in enumerate(texts):
+            if k in used_texts:
+                continue
             try:
                 actor = find_actor(text['x'])
                 elements.append((text['y'], f"note over {actor}: {text['text']}"))
@@ -379,7 +517,7 @@ def convert_statediagram_svg_to_mermaid_text(soup):
 
         # 提取坐标（从 transform）
         transform = node.get('transform', '')
-        x, y = map(float, re.findall(r'translate\(([^,]+),\s*([^)]+)', transform)[0])
+        x, y = map(float, _STATE_TRANSLATE_RE.findall(transform)[0])
         
         node_data.append({
             "id": node.get('id'),
@@ -390,37 +528,44 @@ def convert_statediagram_svg_to_mermaid_text(soup):
 
     # 2. 收集所有连线
     paths = soup.find_all('path', class_='transition')
-    labels = soup.find_all('g', class_='edgeLabel')
+    # 标签的位置和文本只解析一次，没有 transform 的标签视为位于原点
+    label_xy = []
+    label_texts = []
+    for label in soup.find_all('g', class_='edgeLabel'):
+        transform = label.get('transform', '')
+        label_xy.append(tuple(map(float, _STATE_TRANSLATE_RE.findall(transform)[0])) if transform else (0.0, 0.0))
+        label_p = label.find('p')
+        label_texts.append(label_p.get_text(strip=True) if label_p else None)
+    label_xy = np.array(label_xy, dtype=float).reshape(-1, 2)
+
     edge_data = []
     for path in paths:
         # 提取路径的起点和终点（简化版：取第一个和最后一个坐标）
-        d = path.get('d', '')
-        points = re.findall(r'([MLC])([\d.,-]+)', d)
-        coords = []
-        for cmd, coord_str in points:
-            nums = list(map(float, re.findall(r'[-+]?\d*\.\d+|[-+]?\d+', coord_str)))
-            coords.extend(list(zip(nums[::2], nums[1::2])))
-
-        start_point = coords[0] if coords else None
-        end_point = coords[-1] if coords else None
+        # 只需要首尾两个坐标：从两端分别找到第一个至少含一对数字的命令段，中间的命令段不必解析成浮点数
+        segments = [coord_str for _, coord_str in _PATH_CMD_RE.findall(path.get('d', ''))]
+        start_point = end_point = None
+        for coord_str in segments:
+            nums = _PATH_NUM_RE.findall(coord_str)
+            if len(nums) >= 2:
+                start_point = (float(nums[0]), float(nums[1]))
+                break
+        if start_point:
+            for coord_str in reversed(segments):
+                nums = _PATH_NUM_RE.findall(coord_str)
+                if len(nums) >= 2:
+                    # 每段内按两两配对，落单的最后一个数字不构成坐标
+                    last = len(nums) & ~1
+                    end_point = (float(nums[last - 2]), float(nums[last - 1]))
+                    break
 
-        # 关联标签（通过位置匹配）
+        # 关联标签（通过位置匹配）：路径中点附近的标签，多个命中时取最后一个
         label_text = None
-        for label in labels:
-            transform = label.get('transform', '')
-            if not transform:
-                label_x, label_y = map(float, [0, 0])
-            else:
-                label_x, label_y = map(float, re.findall(r'translate\(([^,]+),\s*([^)]+)', transform)[0])
+        if start_point and end_point and label_texts:
+            path_mid = ((start_point[0] + end_point[0]) / 2, (start_point[1] + end_point[1]) / 2)
+            near = np.flatnonzero((np.abs(label_xy - path_mid) < 80).all(axis=1))
+            if near.size:
+                label_text = label_texts[near[-1]]
 
-
-            # 检查标签是否在路径附近（简化逻辑）
-            if start_point and end_point:
-                path_mid_x = (start_point[0] + end_point[0]) / 2
-                path_mid_y = (start_point[1] + end_point[1]) / 2
-                if abs(label_x - path_mid_x) < 80 and abs(label_y - path_mid_y) < 80:
-                    label_text = label.find('p').get_text(strip=True) if label.find('p') else None
-        
         edge_data.append({
             "id": path.get('id'),
             "start": start_point,
@@ -428,35 +573,22 @@ def convert_statediagram_svg_to_mermaid_text(soup):
             "label": label_text
         })
 
-    # 3. 关联节点和边
+    # 3. 关联节点和边：一次性算出所有端点到所有状态节点的距离矩阵，argmin 取最近节点（忽略没有名称的节点）
+    states = [node["state"] for node in node_data if node["state"]]
+    node_pts = np.array([(node["x"], node["y"]) for node in node_data if node["state"]], dtype=float).reshape(-1, 2)
+    located = [edge for edge in edge_data if edge["start"] is not None]
     matched_edges = []
-    for edge in edge_data:
-        start_node = None
-        end_node = None
-        
-        # 找到最近的起点节点
-        min_start_dist = float('inf')
-        for node in node_data:
-            if node["state"]:  # 忽略起始/结束节点
-                dist = math.dist(edge["start"], (node["x"], node["y"]))
-                if dist < min_start_dist:
-                    min_start_dist = dist
-                    start_node = node["state"]
-        
-        # 找到最近的终点节点
-        min_end_dist = float('inf')
-        for node in node_data:
-            if node["state"]:
-                dist = math.dist(edge["end"], (node["x"], node["y"]))
-                if dist < min_end_dist:
-                    min_end_dist = dist
-                    end_node = node["state"]
-        
-        matched_edges.append({
-            "from": start_node,
-            "to": end_node,
-            "label": edge["label"]
-        })
+    if states and located:
+        starts = np.array([edge["start"] for edge in located], dtype=float)
+        ends = np.array([edge["end"] for edge in located], dtype=float)
+        start_idx = ((starts[:, None, :] - node_pts[None, :, :]) ** 2).sum(-1).argmin(1).tolist()
+        end_idx = ((ends[:, None, :] - node_pts[None, :, :]) ** 2).sum(-1).argmin(1).tolist()
+        for edge, i, j in zip(located, start_idx, end_idx):
+            matched_edges.append({
+                "from": states[i],
+                "to": states[j],
+                "label": edge["label"]
+            })
 
     # 3. 生成 Mermaid 代码
     mermaid_lines = ["stateDiagram-v2"]
@@ -472,9 +604,50 @@ def convert_statediagram_svg_to_mermaid_text(soup):
     
     return "```mermaid\n" + "\n".join(mermaid_lines) + "\n```"
 
+# 按 aria-roledescription 中的关键字选择图表转换函数，按顺序匹配第一个命中的关键字
+_DIAGRAM_CONVERTERS = {
+    'flowchart': convert_flowchart_svg_to_mermaid_text,
+    'class': convert_class_svg_to_mermaid_text,
+    'sequence': convert_sequence_svg_to_mermaid_text,
+    'stateDiagram': convert_statediagram_svg_to_mermaid_text,
+}
+
+def _convert_diagram(svg_element: Any, keyword: str, converter) -> str:
+    """
+    转换图表并按内容的 SHA256 缓存结果。计算摘要前 SVG 自身的 ID 替换为占位符，命中时再换回当前页面的 ID
+
+    Parameters:
+        svg_element (Tag): mermaid 图表的 <svg> 元素
+        keyword (str): 图表类型关键字
+        converter (callable): 对应的图表转换函数
+
+    Returns:
+        str: 转换后的 Mermaid 文本，转换失败时为 None
+    """
+    svg_id = svg_element.get('id', '')
+    svg_text = str(svg_element)
+    if svg_id:
+        svg_text = svg_text.replace(svg_id, '\0')
+    # 只保存 SVG 内容的摘要作为键，缓存中不保留整段 SVG 文本
+    key = (keyword, hashlib.sha256(svg_text.encode('utf-8')).digest())
+
+    cached = _diagram_cache.get(key)
+    if cached is None:
+        # 转换失败也缓存为空字符串，避免对同一张图反复重试
+        cached = converter(svg_element) or ''
+        if svg_id:
+            cached = cached.replace(svg_id, '\0')
+        if len(_diagram_cache) < _DIAGRAM_CACHE_MAX_SIZE:
+            _diagram_cache[key] = cached
+
+    if svg_id:
+        cached = cached.replace('\0', svg_id)
+    return cached or None
+
+@lru_cache(maxsize=1024)
 def detect_code_language(code_text: str) -> str:
     """
-    通过不同编程语言的某些特征字来推测语言类型
+    通过不同编程语言的某些特征字来推测语言类型。页面中经常出现重复的代码片段，结果按完整代码缓存
 
     Parameters:
         code_text (int): 网页中的代码内容
@@ -486,42 +659,32 @@ def detect_code_language(code_text: str) -> str:
         return ''
     
     code = code_text.strip()
-    first_line = code.split('\n')[0].strip()
-    
-    # 检测语言模式
-    if 'function ' in code or 'const ' in code or 'let ' in code or 'var ' in code:
-        if ': ' in code and ('interface ' in code or 'type ' in code):
-            return 'typescript'
-        return 'javascript'
-    
-    if 'def ' in code or 'import ' in code or 'from ' in code or 'print(' in code:
-        return 'python'
-    
-    if 'public class ' in code or 'private ' in code or 'public static void main' in code:
-        return 'java'
-    
-    if 'using System' in code or 'namespace ' in code:
-        return 'csharp'
-    
-    if '#include' in code or 'int main' in code:
-        return 'cpp' if 'std::' in code or 'cout' in code else 'c'
-    
-    if 'package ' in code or 'func ' in code:
-        return 'go'
-    
-    if 'fn ' in code or 'let mut' in code:
-        return 'rust'
+    lines = code.split('\n')
+    first_line = lines[0].strip()
+
+    # 按空白一次切分得到单词集合，之后的关键字判断都是常数时间的集合查找。
+    # 不能按非单词字符切分：YAML/JSON 中的 namespace:、"function" 等键名会被误当成关键字
+    tokens = set(code.split())
+
+    # 检测语言模式：按优先级依次匹配关键字规则，命中第一条即返回
+    for lang, keywords, phrases in _LANGUAGE_RULES:
+        if not tokens.isdisjoint(keywords) or any(phrase in code for phrase in phrases):
+            if lang == 'javascript' and ': ' in code and not tokens.isdisjoint(('interface', 'type')):
+                return 'typescript'
+            if lang == 'c' and ('std::' in code or 'cout' in code):
+                return 'cpp'
+            return lang
     
-    if '<?php' in code or '$' in code and ('echo ' in code or 'print ' in code):
+    if '<?php' in code or '$' in code and ('echo' in tokens or 'print' in tokens):
         return 'php'
     
-    if 'def ' in code and 'end' in code:
+    if 'def' in tokens and 'end' in code:
         return 'ruby'
     
     if first_line.startswith('#!') and ('bash' in first_line or 'sh' in first_line):
         return 'bash'
     
-    if re.search(r'\b(SELECT|INSERT|UPDATE|DELETE|CREATE|ALTER|DROP)\b', code, re.I):
+    if _SQL_RE.search(code):
         return 'sql'
     
     if '{' in code and '}' in code and ':' in code:
@@ -533,213 +696,380 @@ def detect_code_language(code_text: str) -> str:
     if '<?xml' in code or ('<' in code and '>' in code and '</' in code):
         return 'xml'
     
-    if (code.startswith('{') and code.endswith('}')) or (code.startswith('[') and code.endswith(']')):
+    if (((code.startswith('{') and code.endswith('}')) or (code.startswith('[') and code.endswith(']')))
+            and code.count('{') == code.count('}') and code.count('[') == code.count(']')):
         try:
             json.loads(code)
             return 'json'
-        except:
+        except ValueError:
             pass
     
-    if any(re.match(r'^\s*\w+:\s*', line) for line in code.split('\n')):
+    if any(_YAML_RE.match(line) for line in lines):
         return 'yaml'
     
     if '# ' in code or '## ' in code or '```' in code:
         return 'markdown'
     
-    if 'FROM ' in code or 'RUN ' in code:
+    if 'FROM' in tokens or 'RUN' in tokens:
         return 'dockerfile'
     
     return ''
 
-def process_node(node: Any) -> str:
+def _format_source_link(text: str) -> str:
     """
-    递归处理 DOM 节点转换为 Markdown
+    把源码链接文本 "文件名 行号" 格式化为 "文件名(L起始 - L结束)"
 
     Parameters:
-        node (Any): 网页节点内容
+        text (str): 链接文本，例如 "src/a.py 10-20"
+
+    Returns:
+        str: 格式化后的链接文本
+    """
+    parts = text.split()
+    return f"{parts[0]}(L{parts[-1].replace('-', ' - L')})&emsp;"
+
+def _prefix_lines(text: str, prefix: str) -> str:
+    """
+    给文本的每一行加上前缀，一次 replace 即可完成，无需先拆分再逐行拼接
+
+    Parameters:
+        text (str): 原始文本
+        prefix (str): 行前缀，例如 "> "
 
     Returns:
-        str: 转换后的 Markdown 内容
+        str: 每行都带有前缀的文本
+    """
+    return prefix + text.replace('\n', '\n' + prefix)
+
+def _pop_output(out: list, start: int) -> str:
     """
+    取出缓冲区中从 start 开始的内容并拼接为字符串，同时把缓冲区恢复原状
 
-    # 文本节点处理
-    if node.string and not node.name:
-        return node.string
+    Parameters:
+        out (list): 输出缓冲区
+        start (int): 起始位置
+
+    Returns:
+        str: 拼接后的 Markdown 内容
+    """
+    content = ''.join(out[start:])
+    del out[start:]
+    return content
+
+def _emit_heading(node: Any, out: list) -> None:
+    """
+    输出 h1~h6 标题
+
+    Parameters:
+        node (Any): 标题节点
+        out (list): 输出缓冲区
+
+    Returns:
+        None
+    """
+    text = node.get_text(strip=True)
+    if text:
+        out.append(f"{'#' * int(node.name[1])} {text}\n\n")
+
+def _emit_pre(node: Any, out: list) -> None:
+    """
+    输出 <pre>：优先尝试把其中的 Mermaid SVG 还原为图表代码，否则按代码块输出
+
+    Parameters:
+        node (Any): pre 节点
+        out (list): 输出缓冲区
+
+    Returns:
+        None
+    """
+    # 尝试转换图表
+    # 先按标签名找到 SVG，再检查 id 前缀，无需经过 CSS 选择器引擎
+    svg_element = node.find('svg')
+    if svg_element is not None and not svg_element.get('id', '').startswith('mermaid-'):
+        svg_element = _SEL_MERMAID_SVG.select_one(node)
+    mermaid_output = None
     
-    # 元素节点处理
-    if not node.name:
-        return ""
+    if svg_element:
+        diagram_type = svg_element.get('aria-roledescription', '')
+        for keyword, converter in _DIAGRAM_CONVERTERS.items():
+            if keyword in diagram_type:
+                mermaid_output = _convert_diagram(svg_element, keyword, converter)
+                break
     
-    # 跳过隐藏元素
-    if node.get('style', '') and ('display: none' in node['style'] or 'visibility: hidden' in node['style']):
-        return ""
+    if mermaid_output:
+        out.append(f"\n{mermaid_output}\n\n")
+    else:
+        # 处理代码块
+        code = node.find('code')
+        lang = ""
+        if code:
+            code_text = code.get_text()
+            # 检测语言
+            lang = detect_code_language(code_text)
+        else:
+            code_text = node.get_text()
+        
+        out.append(f"```{lang}\n{code_text.strip()}\n```\n\n")
+
+def _emit_img(node: Any, out: list) -> None:
+    src = node.get('src', '')
+    alt = node.get('alt', '')
+    if src:
+        out.append(f"![{alt}]({src})\n\n")
+
+def _emit_hr(node: Any, out: list) -> None:
+    out.append("\n---\n\n")
+
+def _emit_code(node: Any, out: list) -> None:
+    out.append(f"`{node.get_text(strip=True)}`")
+
+def _emit_br(node: Any, out: list) -> None:
+    out.append("  \n")
+
+def _emit_table(node: Any, out: list) -> None:
+    """
+    输出表格，第一行作为表头
+
+    Parameters:
+        node (Any): table 节点
+        out (list): 输出缓冲区
+
+    Returns:
+        None
+    """
+    # 各行先收集到列表中，最后一次拼接，避免逐行 += 反复复制整个表格
+    lines = []
+    # 行只会出现在 table 或 thead/tbody/tfoot 的直接子节点中，单元格只会是 tr 的直接子节点
+    rows = [
+        row
+        for child in node.children
+        for row in ((child,) if child.name == 'tr' else
+                    child.children if child.name in _TABLE_SECTION_TAGS else ())
+        if row.name == 'tr'
+    ]
+    if rows:
+        # Header
+        header_cells = [c for c in rows[0].children if c.name in _TABLE_CELL_TAGS]
+        header = "|" + "|".join(cell.get_text(strip=True).replace("|", "\\|") for cell in header_cells) + "|"
+        sep = "|" + "|".join([" --- " for _ in header_cells]) + "|"
+        lines.append(header)
+        lines.append(sep)
+        # Body
+        for row in rows[1:]:
+            cells = [c for c in row.children if c.name in _TABLE_CELL_TAGS]
+            lines.append("|" + "|".join(cell.get_text(strip=True).replace("|", "\\|").replace("\n", " <br> ") for cell in cells) + "|")
+    out.append("\n".join(lines) + "\n\n" if lines else "")
+
+def _close_paragraph(node: Any, out: list, start: int, extra: Any) -> None:
+    content = _pop_output(out, start).strip()
+    if content:
+        out.append(content + "\n\n")
+
+def _close_list(node: Any, out: list, start: int, extra: Any) -> None:
+    # 每个非空列表项已带换行，列表末尾再补一个空行
+    if len(out) > start:
+        out.append('\n')
+
+def _close_link(node: Any, out: list, start: int, extra: Any) -> None:
+    href = node.get('href', '')
+    text = _pop_output(out, start).strip()
     
-    # 跳过不需要的元素
-    if node.name in ['button', 'script', 'style', 'noscript', 'iframe', 'header', 'footer']:
-        return ""
+    # 特殊处理：源码文件链接是 文件名 + 行号 格式
+    if _LINK_RE.search(href):
+        text = _format_source_link(text)
+    
+    if href:
+        out.append(f"[{text}]({href})")
+    else:
+        out.append(text)
+
+def _close_blockquote(node: Any, out: list, start: int, extra: Any) -> None:
+    content = _pop_output(out, start).strip()
+    if content:
+        out.append(_prefix_lines(content, '> ') + '\n\n')
+
+def _close_strong(node: Any, out: list, start: int, extra: Any) -> None:
+    content = _pop_output(out, start).strip()
+    out.append(f"**{content}**")
+
+def _close_emphasis(node: Any, out: list, start: int, extra: Any) -> None:
+    content = _pop_output(out, start).strip()
+    out.append(f"*{content}*")
+
+def _close_details(node: Any, out: list, start: int, extra: Any) -> None:
+    summary, (split,) = extra
+    details_content = _pop_output(out, split)
+    summary_text = _pop_output(out, start) if summary else "Details"
+    out.append(f"> **{summary_text.strip()}**\n" + _prefix_lines(details_content.strip(), '> ') + "\n\n")
+
+def _close_generic(node: Any, out: list, start: int, extra: Any) -> None:
+    # 处理其他元素：子节点已直接写入缓冲区，只有内容非空白时才补充段落分隔
+    if any(piece.strip() for piece in out[start:]):
+        out.append("\n\n")
+    else:
+        del out[start:]
+
+# 按标签名分派的处理函数：叶子类节点在首次访问时直接输出，容器类节点在子节点处理完后收尾
+_EMIT_HANDLERS = {
+    **dict.fromkeys(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'], _emit_heading),
+    'pre': _emit_pre,
+    'img': _emit_img,
+    'hr': _emit_hr,
+    'code': _emit_code,
+    'br': _emit_br,
+    'table': _emit_table,
+}
+_CLOSE_HANDLERS = {
+    'p': _close_paragraph,
+    'ul': _close_list,
+    'ol': _close_list,
+    'a': _close_link,
+    'blockquote': _close_blockquote,
+    'strong': _close_strong,
+    'b': _close_strong,
+    'em': _close_emphasis,
+    'i': _close_emphasis,
+    'details': _close_details,
+}
+
+def process_node(node: Any, out: list) -> None:
+    """
+    处理 DOM 节点转换为 Markdown。用显式栈代替递归，嵌套很深的页面也不会堆积大量 Python 栈帧。
+    隐藏元素和按钮、脚本等不需要的元素由调用者在转换前移除
+
+    Parameters:
+        node (Any): 网页节点内容
+        out (list): 输出缓冲区，转换后的 Markdown 片段依次追加到其中，最终由调用者统一拼接
+
+    Returns:
+        None
+    """
+    stack = [(_ENTER, node)]
+    while stack:
+        task = stack.pop()
+        kind = task[0]
+        if kind == _ENTER:
+            _enter_node(task[1], out, stack)
+        elif kind == _LEAVE:
+            _leave_node(task, out)
+        elif kind == _ITEM:
+            # 列表项：记录起始位置，子节点处理完后再加上列表标记
+            stack.append((_ITEM_END, len(out), task[2]))
+            stack.extend((_ENTER, child) for child in reversed(task[1].contents))
+        elif kind == _ITEM_END:
+            content = _pop_output(out, task[1]).strip()
+            if content:
+                out.append(f"{task[2]} {content}\n")
+        else:
+            # _SPLIT：<details> 的摘要已输出完毕，记录正文的起始位置
+            task[1].append(len(out))
+
+def _enter_node(node: Any, out: list, stack: list) -> None:
+    """
+    首次访问节点：直接输出叶子类节点；容器类节点先压入收尾任务，再按逆序压入子节点
+
+    Parameters:
+        node (Any): 网页节点内容
+        out (list): 输出缓冲区
+        stack (list): 待处理的任务栈
+
+    Returns:
+        None
+    """
+    # 文本节点处理。先判断 name：元素的 .string 会沿着单子节点链递归查找
+    if not node.name:
+        if node.string:
+            out.append(node.string)
+        return
     
-    result_md = ""
+    start = len(out)
     
     try:
-        if node.name == 'p':
-            content = ''.join(process_node(child) for child in node.children)
-            content = content.strip()
-            if content.startswith("```mermaid") and content.endswith("```"):
-                result_md = content + "\n\n"
-            elif content:
-                result_md = content + "\n\n"
-        
-        elif node.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-            level = int(node.name[1])
-            text = node.get_text(strip=True)
-            if text:
-                result_md = f"{'#' * level} {text}\n\n"
+        emit = _EMIT_HANDLERS.get(node.name)
+        if emit is not None:
+            emit(node, out)
         
-        elif node.name == 'ul':
-            items = []
-            for li in node.find_all('li', recursive=False):
-                content = ''.join(process_node(child) for child in li.children).strip()
-                if content:
-                    items.append(f"* {content}")
-            if items:
-                result_md = '\n'.join(items) + '\n\n'
-        
-        elif node.name == 'ol':
-            items = []
-            for i, li in enumerate(node.find_all('li', recursive=False), 1):
-                content = ''.join(process_node(child) for child in li.children).strip()
-                if content:
-                    items.append(f"{i}. {content}")
-            if items:
-                result_md = '\n'.join(items) + '\n\n'
-        
-        elif node.name == 'pre':
-            # 尝试转换图表
-            svg_element = node.select_one('svg[id^="mermaid-"]')
-            mermaid_output = None
-            
-            if svg_element:
-                diagram_type = svg_element.get('aria-roledescription', '')
-                if 'flowchart' in diagram_type:
-                    mermaid_output = convert_flowchart_svg_to_mermaid_text(svg_element)
-                elif 'class' in diagram_type:
-                    mermaid_output = convert_class_svg_to_mermaid_text(svg_element)
-                elif 'sequence' in diagram_type:
-                    mermaid_output = convert_sequence_svg_to_mermaid_text(svg_element)
-                elif 'stateDiagram' in diagram_type:
-                    mermaid_output = convert_statediagram_svg_to_mermaid_text(svg_element)
-            
-            if mermaid_output:
-                result_md = f"\n{mermaid_output}\n\n"
-            else:
-                # 处理代码块
-                code = node.find('code')
-                lang = ""
-                if code:
-                    code_text = code.get_text()
-                    # 检测语言
-                    lang = detect_code_language(code_text)
-                else:
-                    code_text = node.get_text()
-                
-                result_md = f"```{lang}\n{code_text.strip()}\n```\n\n"
-        
-        elif node.name == 'a':
-            href = node.get('href', '')
-            text = ''.join(process_node(child) for child in node.children).strip()
-            
-            # 特殊处理：源码文件链接是 文件名 + 行号 格式
-            if re.search(r'#L(\d+)(?:-L(\d+))?$', href):
-                format_str = lambda s: f"{s.split()[0]}(L{s.split()[-1].replace('-', ' - L')})&emsp;"
-                text = format_str(text)
-            
-            if href:
-                result_md = f"[{text}]({href})"
-            else:
-                result_md = text
-        
-        elif node.name == 'img':
-            src = node.get('src', '')
-            alt = node.get('alt', '')
-            if src:
-                result_md = f"![{alt}]({src})\n\n"
-        
-        elif node.name == 'blockquote':
-            content = ''.join(process_node(child) for child in node.children).strip()
-            if content:
-                lines = content.split('\n')
-                result_md = '\n'.join(f"> {line}" for line in lines) + '\n\n'
-        
-        elif node.name == 'hr':
-            result_md = "\n---\n\n"
-        
-        elif node.name in ['strong', 'b']:
-            content = ''.join(process_node(child) for child in node.children).strip()
-            return f"**{content}**"
-        
-        elif node.name in ['em', 'i']:
-            content = ''.join(process_node(child) for child in node.children).strip()
-            return f"*{content}*"
-        
-        elif node.name == 'code':
-            return f"`{node.get_text(strip=True)}`"
-        
-        elif node.name == 'br':
-            return "  \n"
-        
-        elif node.name == "table":
-            table_md = ""
-            rows = node.find_all('tr')
-            if rows:
-                # Header
-                header_cells = rows[0].find_all(['th', 'td'])
-                header = "|" + "|".join(cell.get_text(strip=True).replace("|", "\\|") for cell in header_cells) + "|"
-                sep = "|" + "|".join([" --- " for _ in header_cells]) + "|"
-                table_md += header + "\n" + sep + "\n"
-                # Body
-                for row in rows[1:]:
-                    cells = row.find_all(['th', 'td'])
-                    row_md = "|" + "|".join(cell.get_text(strip=True).replace("|", "\\|").replace("\n", " <br> ") for cell in cells) + "|"
-                    table_md += row_md + "\n"
-            return table_md + ("\n" if table_md else "")
+        elif node.name in ('ul', 'ol'):
+            items = [c for c in node.children if c.name == 'li']
+            stack.append((_LEAVE, node, start, None))
+            # 逆序压栈，保证列表项按原顺序处理；有序列表的序号包含空列表项
+            for i in range(len(items), 0, -1):
+                stack.append((_ITEM, items[i - 1], '*' if node.name == 'ul' else f"{i}."))
+            return
         
         elif node.name == "details":
+            # 先输出摘要，再由 _SPLIT 记录正文起点，收尾时分别取出两部分
             summary = node.find('summary')
-            summary_text = process_node(summary) if summary else "Details"
-            details_content = ''.join(process_node(c) for c in node.children if c.name != "summary")
-            return f"> **{summary_text.strip()}**\n" + '\n'.join([f"> {l}" for l in details_content.strip().split('\n')]) + "\n\n"
+            split = []
+            stack.append((_LEAVE, node, start, (summary, split)))
+            stack.extend((_ENTER, c) for c in reversed(node.contents) if c.name != "summary")
+            stack.append((_SPLIT, split))
+            if summary:
+                stack.append((_ENTER, summary))
+            return
 
         else:
-            # 处理其他元素
-            content = ''.join(process_node(child) for child in node.children)
-            result_md = content + "\n\n" if content.strip() else ""
-    
-    except Exception as e:
-        printf(f"处理节点错误: {node.name} - {str(e)}")
-        return f"[ERROR_PROCESSING:{node.name}]"
+            # 段落、链接、强调等容器节点：子节点处理完后在 _leave_node 中收尾
+            stack.append((_LEAVE, node, start, None))
+            stack.extend((_ENTER, child) for child in reversed(node.contents))
+            return
     
-    return result_md
+    except Exception:
+        del out[start:]
+        logger.debug("处理节点错误: %s", node.name, exc_info=True)
+        out.append(f"[ERROR_PROCESSING:{node.name}]")
 
-def deepwiki2markdown(url: str, output_path: str):
+def _leave_node(task: tuple, out: list) -> None:
     """
-    解析 Deepwiki 的 URL 页面内容，并转为 Markdown 文件
+    容器节点的子节点全部处理完毕后，取出子节点的输出并按节点类型收尾
 
     Parameters:
-        url (str): Deepwiki 的 URL
-        output_path (str): 转换后 Markdown 文档的保存路径
+        task (tuple): 由 _enter_node 压入的收尾任务 (_LEAVE, 节点, 起始位置, 附加数据)
+        out (list): 输出缓冲区
 
     Returns:
         None
     """
-    # svg = '<svg aria-roledescription="stateDiagram" role="graphics-document document" viewBox="0 0 481.77606201171875 462" style="max-width: 481.77606201171875px;" class="statediagram" xmlns:xlink="http://www.w3.org/1999/xlink" xmlns="http://www.w3.org/2000/svg" width="100%" id="mermaid-jb4fwweijp"><style>#mermaid-jb4fwweijp{font-family:ui-sans-serif,-apple-system,system-ui,Segoe UI,Helvetica;font-size:16px;fill:#333;}@keyframes edge-animation-frame{from{stroke-dashoffset:0;}}@keyframes dash{to{stroke-dashoffset:0;}}#mermaid-jb4fwweijp .edge-animation-slow{stroke-dasharray:9,5!important;stroke-dashoffset:900;animation:dash 50s linear infinite;stroke-linecap:round;}#mermaid-jb4fwweijp .edge-animation-fast{stroke-dasharray:9,5!important;stroke-dashoffset:900;animation:dash 20s linear infinite;stroke-linecap:round;}#mermaid-jb4fwweijp .error-icon{fill:#dddddd;}#mermaid-jb4fwweijp .error-text{fill:#222222;stroke:#222222;}#mermaid-jb4fwweijp .edge-thickness-normal{stroke-width:1px;}#mermaid-jb4fwweijp .edge-thickness-thick{stroke-width:3.5px;}#mermaid-jb4fwweijp .edge-pattern-solid{stroke-dasharray:0;}#mermaid-jb4fwweijp .edge-thickness-invisible{stroke-width:0;fill:none;}#mermaid-jb4fwweijp .edge-pattern-dashed{stroke-dasharray:3;}#mermaid-jb4fwweijp .edge-pattern-dotted{stroke-dasharray:2;}#mermaid-jb4fwweijp .marker{fill:#999;stroke:#999;}#mermaid-jb4fwweijp .marker.cross{stroke:#999;}#mermaid-jb4fwweijp svg{font-family:ui-sans-serif,-apple-system,system-ui,Segoe UI,Helvetica;font-size:16px;}#mermaid-jb4fwweijp p{margin:0;}#mermaid-jb4fwweijp defs #statediagram-barbEnd{fill:#999;stroke:#999;}#mermaid-jb4fwweijp g.stateGroup text{fill:#dddddd;stroke:none;font-size:10px;}#mermaid-jb4fwweijp g.stateGroup text{fill:#333;stroke:none;font-size:10px;}#mermaid-jb4fwweijp g.stateGroup .state-title{font-weight:bolder;fill:#333;}#mermaid-jb4fwweijp g.stateGroup rect{fill:#ffffff;stroke:#dddddd;}#mermaid-jb4fwweijp g.stateGroup line{stroke:#999;stroke-width:1;}#mermaid-jb4fwweijp .transition{stroke:#999;stroke-width:1;fill:none;}#mermaid-jb4fwweijp .stateGroup .composit{fill:#f4f4f4;border-bottom:1px;}#mermaid-jb4fwweijp .stateGroup .alt-composit{fill:#e0e0e0;border-bottom:1px;}#mermaid-jb4fwweijp .state-note{stroke:#e6d280;fill:#fff5ad;}#mermaid-jb4fwweijp .state-note text{fill:#333;stroke:none;font-size:10px;}#mermaid-jb4fwweijp .stateLabel .box{stroke:none;stroke-width:0;fill:#ffffff;opacity:0.5;}#mermaid-jb4fwweijp .edgeLabel .label rect{fill:#ffffff;opacity:0.5;}#mermaid-jb4fwweijp .edgeLabel{background-color:#ffffff;text-align:center;}#mermaid-jb4fwweijp .edgeLabel p{background-color:#ffffff;}#mermaid-jb4fwweijp .edgeLabel rect{opacity:0.5;background-color:#ffffff;fill:#ffffff;}#mermaid-jb4fwweijp .edgeLabel .label text{fill:#333;}#mermaid-jb4fwweijp .label div .edgeLabel{color:#333;}#mermaid-jb4fwweijp .stateLabel text{fill:#333;font-size:10px;font-weight:bold;}#mermaid-jb4fwweijp .node circle.state-start{fill:#999;stroke:#999;}#mermaid-jb4fwweijp .node .fork-join{fill:#999;stroke:#999;}#mermaid-jb4fwweijp .node circle.state-end{fill:#dddddd;stroke:#f4f4f4;stroke-width:1.5;}#mermaid-jb4fwweijp .end-state-inner{fill:#f4f4f4;stroke-width:1.5;}#mermaid-jb4fwweijp .node rect{fill:#ffffff;stroke:#dddddd;stroke-width:1px;}#mermaid-jb4fwweijp .node polygon{fill:#ffffff;stroke:#dddddd;stroke-width:1px;}#mermaid-jb4fwweijp #statediagram-barbEnd{fill:#999;}#mermaid-jb4fwweijp .statediagram-cluster rect{fill:#ffffff;stroke:#dddddd;stroke-width:1px;}#mermaid-jb4fwweijp .cluster-label,#mermaid-jb4fwweijp .nodeLabel{color:#333;}#mermaid-jb4fwweijp .statediagram-cluster rect.outer{rx:5px;ry:5px;}#mermaid-jb4fwweijp .statediagram-state .divider{stroke:#dddddd;}#mermaid-jb4fwweijp .statediagram-state .title-state{rx:5px;ry:5px;}#mermaid-jb4fwweijp .statediagram-cluster.statediagram-cluster .inner{fill:#f4f4f4;}#mermaid-jb4fwweijp .statediagram-cluster.statediagram-cluster-alt .inner{fill:#f8f8f8;}#mermaid-jb4fwweijp .statediagram-cluster .inner{rx:0;ry:0;}#mermaid-jb4fwweijp .statediagram-state rect.basic{rx:5px;ry:5px;}#mermaid-jb4fwweijp .statediagram-state rect.divider{stroke-dasharray:10,10;fill:#f8f8f8;}#mermaid-jb4fwweijp .note-edge{stroke-dasharray:5;}#mermaid-jb4fwweijp .statediagram-note rect{fill:#fff5ad;stroke:#e6d280;stroke-width:1px;rx:0;ry:0;}#mermaid-jb4fwweijp .statediagram-note rect{fill:#fff5ad;stroke:#e6d280;stroke-width:1px;rx:0;ry:0;}#mermaid-jb4fwweijp .statediagram-note text{fill:#333;}#mermaid-jb4fwweijp .statediagram-note .nodeLabel{color:#333;}#mermaid-jb4fwweijp .statediagram .edgeLabel{color:red;}#mermaid-jb4fwweijp #dependencyStart,#mermaid-jb4fwweijp #dependencyEnd{fill:#999;stroke:#999;stroke-width:1;}#mermaid-jb4fwweijp .statediagramTitleText{text-anchor:middle;font-size:18px;fill:#333;}#mermaid-jb4fwweijp :root{--mermaid-font-family:"trebuchet ms",verdana,arial,sans-serif;}</style><g><defs><marker orient="auto" markerUnits="userSpaceOnUse" markerHeight="14" markerWidth="20" refY="7" refX="19" id="mermaid-jb4fwweijp_stateDiagram-barbEnd"><path d="M 19,7 L9,13 L14,7 L9,1 Z"></path></marker></defs><g class="root"><g class="clusters"></g><g class="edgePaths"><path marker-end="url(#mermaid-jb4fwweijp_stateDiagram-barbEnd)" style="fill:none;" class="edge-thickness-normal edge-pattern-solid transition" id="edge0" d="M357.508,22L357.508,26.167C357.508,30.333,357.508,38.667,357.508,47C357.508,55.333,357.508,63.667,357.508,67.833L357.508,72"></path><path marker-end="url(#mermaid-jb4fwweijp_stateDiagram-barbEnd)" style="fill:none;" class="edge-thickness-normal edge-pattern-solid transition" id="edge1" d="M318.716,100.553L282.094,108.627C245.472,116.702,172.228,132.851,155.441,148.593C138.654,164.336,178.323,179.671,198.158,187.339L217.992,195.007"></path><path marker-end="url(#mermaid-jb4fwweijp_stateDiagram-barbEnd)" style="fill:none;" class="edge-thickness-normal edge-pattern-solid transition" id="edge2" d="M217.992,219.332L202.468,226.61C186.944,233.888,155.897,248.444,140.373,261.889C124.849,275.333,124.849,287.667,124.849,293.833L124.849,300"></path><path marker-end="url(#mermaid-jb4fwweijp_stateDiagram-barbEnd)" style="fill:none;" class="edge-thickness-normal edge-pattern-solid transition" id="edge3" d="M246.366,226L246.346,232.167C246.326,238.333,246.287,250.667,251.076,263C255.866,275.333,265.484,287.667,270.294,293.833L275.103,300"></path><path marker-end="url(#mermaid-jb4fwweijp_stateDiagram-barbEnd)" style="fill:none;" class="edge-thickness-normal edge-pattern-solid transition" id="edge4" d="M241.577,186L240.08,179.833C238.584,173.667,235.592,161.333,248.448,148.617C261.305,135.901,290.01,122.801,304.363,116.252L318.716,109.702"></path><path marker-end="url(#mermaid-jb4fwweijp_stateDiagram-barbEnd)" style="fill:none;" class="edge-thickness-normal edge-pattern-solid transition" id="edge5" d="M124.849,340L124.849,346.167C124.849,352.333,124.849,364.667,136.506,377C148.163,389.333,171.478,401.667,183.135,407.833L194.792,414"></path><path marker-end="url(#mermaid-jb4fwweijp_stateDiagram-barbEnd)" style="fill:none;" class="edge-thickness-normal edge-pattern-solid transition" id="edge6" d="M290.193,417.416L313.587,410.68C336.981,403.944,383.769,390.472,407.163,374.236C430.557,358,430.557,339,430.557,320C430.557,301,430.557,282,404.609,264.467C378.661,246.934,326.764,230.869,300.816,222.836L274.867,214.803"></path><path marker-end="url(#mermaid-jb4fwweijp_stateDiagram-barbEnd)" style="fill:none;" class="edge-thickness-normal edge-pattern-solid transition" id="edge7" d="M306.298,300L311.107,293.833C315.917,287.667,325.535,275.333,320.297,262.712C315.058,250.09,294.963,237.18,284.915,230.725L274.867,224.269"></path><path marker-end="url(#mermaid-jb4fwweijp_stateDiagram-barbEnd)" style="fill:none;" class="edge-thickness-normal edge-pattern-solid transition" id="edge8" d="M274.867,190.643L287.719,183.702C300.571,176.762,326.275,162.881,339.725,149.774C353.175,136.667,354.372,124.333,354.97,118.167L355.568,112"></path><path marker-end="url(#mermaid-jb4fwweijp_stateDiagram-barbEnd)" style="fill:none;" class="edge-thickness-normal edge-pattern-solid transition" id="edge9" d="M389.515,112L399.384,118.167C409.253,124.333,428.991,136.667,438.86,151.167C448.729,165.667,448.729,182.333,448.729,190.667L448.729,199"></path></g><g class="edgeLabels"><g class="edgeLabel"><g transform="translate(0, 0)" class="label"><foreignObject height="0" width="0"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" class="labelBkg" xmlns="http://www.w3.org/1999/xhtml"><span class="edgeLabel"></span></div></foreignObject></g></g><g transform="translate(98.984375, 149)" class="edgeLabel"><g transform="translate(-90.984375, -12)" class="label"><foreignObject height="24" width="181.96875"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" class="labelBkg" xmlns="http://www.w3.org/1999/xhtml"><span class="edgeLabel"><p>connect()/bind()/listen()</p></span></div></foreignObject></g></g><g transform="translate(124.84895706176758, 263)" class="edgeLabel"><g transform="translate(-35.833335876464844, -12)" class="label"><foreignObject height="24" width="71.66667175292969"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" class="labelBkg" xmlns="http://www.w3.org/1999/xhtml"><span class="edgeLabel"><p>connect()</p></span></div></foreignObject></g></g><g transform="translate(246.2473964691162, 263)" class="edgeLabel"><g transform="translate(-25.6875, -12)" class="label"><foreignObject height="24" width="51.375"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" class="labelBkg" xmlns="http://www.w3.org/1999/xhtml"><span class="edgeLabel"><p>listen()</p></span></div></foreignObject></g></g><g transform="translate(232.5989589691162, 149)" class="edgeLabel"><g transform="translate(-22.63020896911621, -12)" class="label"><foreignObject height="24" width="45.26041793823242"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" class="labelBkg" xmlns="http://www.w3.org/1999/xhtml"><span class="edgeLabel"><p>bind()</p></span></div></foreignObject></g></g><g transform="translate(124.84895706176758, 377)" class="edgeLabel"><g transform="translate(-80.578125, -12)" class="label"><foreignObject height="24" width="161.15625"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" class="labelBkg" xmlns="http://www.w3.org/1999/xhtml"><span class="edgeLabel"><p>handshake_complete</p></span></div></foreignObject></g></g><g transform="translate(430.5572929382324, 320)" class="edgeLabel"><g transform="translate(-43.21875, -12)" class="label"><foreignObject height="24" width="86.4375"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" class="labelBkg" xmlns="http://www.w3.org/1999/xhtml"><span class="edgeLabel"><p>shutdown()</p></span></div></foreignObject></g></g><g transform="translate(335.1536464691162, 263)" class="edgeLabel"><g transform="translate(-43.21875, -12)" class="label"><foreignObject height="24" width="86.4375"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" class="labelBkg" xmlns="http://www.w3.org/1999/xhtml"><span class="edgeLabel"><p>shutdown()</p></span></div></foreignObject></g></g><g transform="translate(351.9791679382324, 149)" class="edgeLabel"><g transform="translate(-76.75, -12)" class="label"><foreignObject height="24" width="153.5"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" class="labelBkg" xmlns="http://www.w3.org/1999/xhtml"><span class="edgeLabel"><p>operation_complete</p></span></div></foreignObject></g></g><g class="edgeLabel"><g transform="translate(0, 0)" class="label"><foreignObject height="0" width="0"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" class="labelBkg" xmlns="http://www.w3.org/1999/xhtml"><span class="edgeLabel"></span></div></foreignObject></g></g></g><g class="nodes"><g transform="translate(357.5078134536743, 15)" id="state-root_start-0" class="node default"><circle height="14" width="14" r="7" class="state-start"></circle></g><g transform="translate(357.5078134536743, 92)" id="state-CLOSED-9" class="node  statediagram-state"><rect height="40" width="77.58333587646484" y="-20" x="-38.79166793823242" ry="5" rx="5" style="" class="basic label-container"></rect><g transform="translate(-30.791667938232422, -12)" style="" class="label"><rect></rect><foreignObject height="24" width="61.583335876464844"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" xmlns="http://www.w3.org/1999/xhtml"><span class="nodeLabel"><p>CLOSED</p></span></div></foreignObject></g></g><g transform="translate(246.42968845367432, 206)" id="state-BUSY-8" class="node  statediagram-state"><rect height="40" width="56.875" y="-20" x="-28.4375" ry="5" rx="5" style="" class="basic label-container"></rect><g transform="translate(-20.4375, -12)" style="" class="label"><rect></rect><foreignObject height="24" width="40.875"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" xmlns="http://www.w3.org/1999/xhtml"><span class="nodeLabel"><p>BUSY</p></span></div></foreignObject></g></g><g transform="translate(124.84895706176758, 320)" id="state-CONNECTING-5" class="node  statediagram-state"><rect height="40" width="123.8125" y="-20" x="-61.90625" ry="5" rx="5" style="" class="basic label-container"></rect><g transform="translate(-53.90625, -12)" style="" class="label"><rect></rect><foreignObject height="24" width="107.8125"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" xmlns="http://www.w3.org/1999/xhtml"><span class="nodeLabel"><p>CONNECTING</p></span></div></foreignObject></g></g><g transform="translate(290.7005214691162, 320)" id="state-LISTENING-7" class="node  statediagram-state"><rect height="40" width="98.73958587646484" y="-20" x="-49.36979293823242" ry="5" rx="5" style="" class="basic label-container"></rect><g transform="translate(-41.36979293823242, -12)" style="" class="label"><rect></rect><foreignObject height="24" width="82.73958587646484"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" xmlns="http://www.w3.org/1999/xhtml"><span class="nodeLabel"><p>LISTENING</p></span></div></foreignObject></g></g><g transform="translate(232.5989589691162, 434)" id="state-CONNECTED-6" class="node  statediagram-state"><rect height="40" width="115.1875" y="-20" x="-57.59375" ry="5" rx="5" style="" class="basic label-container"></rect><g transform="translate(-49.59375, -12)" style="" class="label"><rect></rect><foreignObject height="24" width="99.1875"><div style="display: table-cell; white-space: nowrap; line-height: 1.5; max-width: 200px; text-align: center;" xmlns="http://www.w3.org/1999/xhtml"><span class="nodeLabel"><p>CONNECTED</p></span></div></foreignObject></g></g><g transform="translate(448.7291679382324, 206)" id="state-root_end-9" class="node default"><g><path style="" fill="#ffffff" stroke-width="0" stroke="none" d="M7 0 C7 0.40517908122283747, 6.964012880168563 0.816513743121899, 6.893654271085456 1.2155372436685123 C6.823295662002349 1.6145607442151257, 6.716427752933756 2.013397210557766, 6.5778483455013586 2.394141003279681 C6.439268938068961 2.7748847960015954, 6.26476736710249 3.149104622578984, 6.062177826491071 3.4999999999999996 C5.859588285879653 3.8508953774210153, 5.622755194947063 4.189128084166967, 5.362311101832846 4.499513267805774 C5.10186700871863 4.809898451444582, 4.809898451444583 5.10186700871863, 4.499513267805775 5.362311101832846 C4.189128084166968 5.622755194947063, 3.8508953774210166 5.859588285879652, 3.500000000000001 6.06217782649107 C3.149104622578985 6.264767367102489, 2.7748847960015963 6.439268938068961, 2.3941410032796817 6.5778483455013586 C2.013397210557767 6.716427752933756, 1.6145607442151264 6.823295662002349, 1.2155372436685128 6.893654271085456 C0.8165137431218992 6.964012880168563, 0.4051790812228379 7, 4.286263797015736e-16 7 C-0.405179081222837 7, -0.8165137431218985 6.964012880168563, -1.2155372436685121 6.893654271085456 C-1.6145607442151257 6.823295662002349, -2.0133972105577667 6.716427752933756, -2.394141003279681 6.5778483455013586 C-2.774884796001595 6.439268938068961, -3.149104622578983 6.26476736710249, -3.4999999999999982 6.062177826491071 C-3.8508953774210135 5.859588285879653, -4.189128084166966 5.6227551949470636, -4.499513267805773 5.362311101832848 C-4.809898451444581 5.101867008718632, -5.101867008718628 4.809898451444586, -5.3623111018328435 4.499513267805779 C-5.622755194947059 4.189128084166971, -5.859588285879649 3.8508953774210206, -6.062177826491068 3.5000000000000053 C-6.264767367102486 3.14910462257899, -6.439268938068958 2.774884796001602, -6.577848345501356 2.394141003279688 C-6.716427752933754 2.0133972105577738, -6.823295662002347 1.614560744215134, -6.893654271085454 1.215537243668521 C-6.9640128801685615 0.816513743121908, -6.999999999999999 0.4051790812228472, -7 1.0183126166254463e-14 C-7.000000000000001 -0.40517908122282686, -6.964012880168565 -0.8165137431218878, -6.893654271085459 -1.215537243668501 C-6.823295662002352 -1.6145607442151142, -6.716427752933759 -2.0133972105577542, -6.577848345501363 -2.394141003279669 C-6.439268938068967 -2.7748847960015834, -6.264767367102496 -3.149104622578972, -6.062177826491078 -3.4999999999999876 C-5.859588285879661 -3.8508953774210033, -5.6227551949470715 -4.1891280841669545, -5.362311101832856 -4.499513267805763 C-5.10186700871864 -4.809898451444571, -4.809898451444594 -5.10186700871862, -4.499513267805787 -5.362311101832836 C-4.189128084166979 -5.622755194947053, -3.850895377421028 -5.859588285879643, -3.5000000000000133 -6.062177826491062 C-3.1491046225789985 -6.264767367102482, -2.774884796001611 -6.439268938068954, -2.3941410032796973 -6.577848345501353 C-2.0133972105577835 -6.716427752933752, -1.6145607442151435 -6.823295662002345, -1.2155372436685306 -6.893654271085453 C-0.8165137431219176 -6.9640128801685615, -0.40517908122285695 -6.999999999999999, -1.9937625952807352e-14 -7 C0.4051790812228171 -7.000000000000001, 0.8165137431218781 -6.964012880168565, 1.2155372436684913 -6.89365427108546 C1.6145607442151044 -6.823295662002354, 2.013397210557745 -6.716427752933763, 2.3941410032796595 -6.5778483455013665 C2.774884796001574 -6.43926893806897, 3.149104622578963 -6.2647673671025, 3.499999999999979 -6.062177826491083 C3.8508953774209953 -5.859588285879665, 4.189128084166947 -5.622755194947077, 4.499513267805756 -5.362311101832862 C4.809898451444564 -5.1018670087186475, 5.101867008718613 -4.809898451444602, 5.362311101832829 -4.499513267805796 C5.622755194947046 -4.189128084166989, 5.859588285879637 -3.8508953774210393, 6.062177826491056 -3.500000000000025 C6.2647673671024755 -3.1491046225790105, 6.439268938068949 -2.774884796001623, 6.577848345501348 -2.3941410032797092 C6.716427752933747 -2.0133972105577955, 6.823295662002342 -1.6145607442151562, 6.893654271085451 -1.2155372436685434 C6.96401288016856 -0.8165137431219307, 6.982275711847575 -0.2025895406114567, 7 -3.2800750208310675e-14 C7.017724288152425 0.2025895406113911, 7.017724288152424 -0.2025895406114242, 7 0"></path><path style="" fill="none" stroke-width="2" stroke="#999" d="M7 0 C7 0.40517908122283747, 6.964012880168563 0.816513743121899, 6.893654271085456 1.2155372436685123 C6.823295662002349 1.6145607442151257, 6.716427752933756 2.013397210557766, 6.5778483455013586 2.394141003279681 C6.439268938068961 2.7748847960015954, 6.26476736710249 3.149104622578984, 6.062177826491071 3.4999999999999996 C5.859588285879653 3.8508953774210153, 5.622755194947063 4.189128084166967, 5.362311101832846 4.499513267805774 C5.10186700871863 4.809898451444582, 4.809898451444583 5.10186700871863, 4.499513267805775 5.362311101832846 C4.189128084166968 5.622755194947063, 3.8508953774210166 5.859588285879652, 3.500000000000001 6.06217782649107 C3.149104622578985 6.264767367102489, 2.7748847960015963 6.439268938068961, 2.3941410032796817 6.5778483455013586 C2.013397210557767 6.716427752933756, 1.6145607442151264 6.823295662002349, 1.2155372436685128 6.893654271085456 C0.8165137431218992 6.964012880168563, 0.4051790812228379 7, 4.286263797015736e-16 7 C-0.405179081222837 7, -0.8165137431218985 6.964012880168563, -1.2155372436685121 6.893654271085456 C-1.6145607442151257 6.823295662002349, -2.0133972105577667 6.716427752933756, -2.394141003279681 6.5778483455013586 C-2.774884796001595 6.439268938068961, -3.149104622578983 6.26476736710249, -3.4999999999999982 6.062177826491071 C-3.8508953774210135 5.859588285879653, -4.189128084166966 5.6227551949470636, -4.499513267805773 5.362311101832848 C-4.809898451444581 5.101867008718632, -5.101867008718628 4.809898451444586, -5.3623111018328435 4.499513267805779 C-5.622755194947059 4.189128084166971, -5.859588285879649 3.8508953774210206, -6.062177826491068 3.5000000000000053 C-6.264767367102486 3.14910462257899, -6.439268938068958 2.774884796001602, -6.577848345501356 2.394141003279688 C-6.716427752933754 2.0133972105577738, -6.823295662002347 1.614560744215134, -6.893654271085454 1.215537243668521 C-6.9640128801685615 0.816513743121908, -6.999999999999999 0.4051790812228472, -7 1.0183126166254463e-14 C-7.000000000000001 -0.40517908122282686, -6.964012880168565 -0.8165137431218878, -6.893654271085459 -1.215537243668501 C-6.823295662002352 -1.6145607442151142, -6.716427752933759 -2.0133972105577542, -6.577848345501363 -2.394141003279669 C-6.439268938068967 -2.7748847960015834, -6.264767367102496 -3.149104622578972, -6.062177826491078 -3.4999999999999876 C-5.859588285879661 -3.8508953774210033, -5.6227551949470715 -4.1891280841669545, -5.362311101832856 -4.499513267805763 C-5.10186700871864 -4.809898451444571, -4.809898451444594 -5.10186700871862, -4.499513267805787 -5.362311101832836 C-4.189128084166979 -5.622755194947053, -3.850895377421028 -5.859588285879643, -3.5000000000000133 -6.062177826491062 C-3.1491046225789985 -6.264767367102482, -2.774884796001611 -6.439268938068954, -2.3941410032796973 -6.577848345501353 C-2.0133972105577835 -6.716427752933752, -1.6145607442151435 -6.823295662002345, -1.2155372436685306 -6.893654271085453 C-0.8165137431219176 -6.9640128801685615, -0.40517908122285695 -6.999999999999999, -1.9937625952807352e-14 -7 C0.4051790812228171 -7.000000000000001, 0.8165137431218781 -6.964012880168565, 1.2155372436684913 -6.89365427108546 C1.6145607442151044 -6.823295662002354, 2.013397210557745 -6.716427752933763, 2.3941410032796595 -6.5778483455013665 C2.774884796001574 -6.43926893806897, 3.149104622578963 -6.2647673671025, 3.499999999999979 -6.062177826491083 C3.8508953774209953 -5.859588285879665, 4.189128084166947 -5.622755194947077, 4.499513267805756 -5.362311101832862 C4.809898451444564 -5.1018670087186475, 5.101867008718613 -4.809898451444602, 5.362311101832829 -4.499513267805796 C5.622755194947046 -4.189128084166989, 5.859588285879637 -3.8508953774210393, 6.062177826491056 -3.500000000000025 C6.2647673671024755 -3.1491046225790105, 6.439268938068949 -2.774884796001623, 6.577848345501348 -2.3941410032797092 C6.716427752933747 -2.0133972105577955, 6.823295662002342 -1.6145607442151562, 6.893654271085451 -1.2155372436685434 C6.96401288016856 -0.8165137431219307, 6.982275711847575 -0.2025895406114567, 7 -3.2800750208310675e-14 C7.017724288152425 0.2025895406113911, 7.017724288152424 -0.2025895406114242, 7 0"></path><g><path style="" fill="#dddddd" stroke-width="0" stroke="none" d="M2.5 0 C2.5 0.14470681472244193, 2.487147457203058 0.29161205111496386, 2.46201938253052 0.4341204441673258 C2.436891307857982 0.5766288372196877, 2.3987241974763416 0.7190704323420595, 2.3492315519647713 0.8550503583141718 C2.299738906453201 0.991030284286284, 2.2374169168223177 1.124680222349637, 2.165063509461097 1.2499999999999998 C2.092710102099876 1.3753197776503625, 2.0081268553382365 1.496117172916774, 1.915111107797445 1.6069690242163481 C1.8220953602566536 1.7178208755159223, 1.7178208755159226 1.8220953602566536, 1.6069690242163484 1.915111107797445 C1.4961171729167742 2.0081268553382365, 1.375319777650363 2.0927101020998755, 1.2500000000000002 2.1650635094610964 C1.1246802223496375 2.2374169168223172, 0.9910302842862845 2.2997389064532, 0.8550503583141721 2.349231551964771 C0.7190704323420597 2.3987241974763416, 0.576628837219688 2.436891307857982, 0.43412044416732604 2.46201938253052 C0.291612051114964 2.487147457203058, 0.14470681472244212 2.5, 1.5308084989341916e-16 2.5 C-0.1447068147224418 2.5, -0.2916120511149638 2.487147457203058, -0.43412044416732576 2.46201938253052 C-0.5766288372196877 2.436891307857982, -0.7190704323420595 2.3987241974763416, -0.8550503583141718 2.3492315519647713 C-0.991030284286284 2.299738906453201, -1.124680222349637 2.2374169168223177, -1.2499999999999996 2.165063509461097 C-1.375319777650362 2.092710102099876, -1.4961171729167733 2.008126855338237, -1.6069690242163475 1.9151111077974459 C-1.7178208755159217 1.8220953602566548, -1.822095360256653 1.7178208755159234, -1.9151111077974443 1.6069690242163495 C-2.0081268553382357 1.4961171729167755, -2.0927101020998746 1.3753197776503645, -2.1650635094610955 1.250000000000002 C-2.2374169168223164 1.1246802223496395, -2.2997389064531992 0.9910302842862865, -2.34923155196477 0.8550503583141743 C-2.3987241974763407 0.7190704323420621, -2.436891307857981 0.5766288372196907, -2.4620193825305194 0.434120444167329 C-2.487147457203058 0.29161205111496724, -2.5 0.14470681472244545, -2.5 3.636830773662308e-15 C-2.5 -0.14470681472243818, -2.4871474572030587 -0.2916120511149599, -2.4620193825305208 -0.4341204441673218 C-2.436891307857983 -0.5766288372196837, -2.398724197476343 -0.7190704323420553, -2.3492315519647726 -0.8550503583141675 C-2.2997389064532023 -0.9910302842862798, -2.23741691682232 -1.1246802223496328, -2.165063509461099 -1.2499999999999956 C-2.092710102099878 -1.3753197776503583, -2.00812685533824 -1.4961171729167695, -1.9151111077974488 -1.606969024216344 C-1.8220953602566576 -1.7178208755159183, -1.7178208755159263 -1.82209536025665, -1.6069690242163523 -1.9151111077974416 C-1.4961171729167784 -2.0081268553382334, -1.3753197776503672 -2.0927101020998724, -1.2500000000000047 -2.1650635094610937 C-1.1246802223496422 -2.237416916822315, -0.9910302842862897 -2.299738906453198, -0.8550503583141776 -2.3492315519647686 C-0.7190704323420656 -2.3987241974763394, -0.5766288372196942 -2.4368913078579806, -0.43412044416733236 -2.462019382530519 C-0.29161205111497057 -2.4871474572030574, -0.1447068147224489 -2.4999999999999996, -7.120580697431198e-15 -2.5 C0.14470681472243463 -2.5000000000000004, 0.29161205111495647 -2.487147457203059, 0.4341204441673183 -2.4620193825305217 C0.5766288372196802 -2.436891307857984, 0.7190704323420518 -2.3987241974763442, 0.8550503583141642 -2.349231551964774 C0.9910302842862766 -2.2997389064532037, 1.1246802223496295 -2.2374169168223212, 1.2499999999999925 -2.165063509461101 C1.3753197776503554 -2.0927101020998804, 1.4961171729167668 -2.008126855338242, 1.6069690242163412 -1.915111107797451 C1.7178208755159157 -1.82209536025666, 1.8220953602566472 -1.7178208755159294, 1.915111107797439 -1.6069690242163557 C2.0081268553382308 -1.496117172916782, 2.09271010209987 -1.3753197776503712, 2.1650635094610915 -1.2500000000000089 C2.237416916822313 -1.1246802223496466, 2.299738906453196 -0.9910302842862939, 2.3492315519647673 -0.855050358314182 C2.3987241974763385 -0.71907043234207, 2.4368913078579792 -0.5766288372196986, 2.462019382530518 -0.4341204441673369 C2.487147457203057 -0.29161205111497523, 2.4936698970884197 -0.07235340736123454, 2.5 -1.1714553645825241e-14 C2.5063301029115803 0.07235340736121111, 2.50633010291158 -0.07235340736122292, 2.5 0"></path><path style="" fill="none" stroke-width="2" stroke="#dddddd" d="M2.5 0 C2.5 0.14470681472244193, 2.487147457203058 0.29161205111496386, 2.46201938253052 0.4341204441673258 C2.436891307857982 0.5766288372196877, 2.3987241974763416 0.7190704323420595, 2.3492315519647713 0.8550503583141718 C2.299738906453201 0.991030284286284, 2.2374169168223177 1.124680222349637, 2.165063509461097 1.2499999999999998 C2.092710102099876 1.3753197776503625, 2.0081268553382365 1.496117172916774, 1.915111107797445 1.6069690242163481 C1.8220953602566536 1.7178208755159223, 1.7178208755159226 1.8220953602566536, 1.6069690242163484 1.915111107797445 C1.4961171729167742 2.0081268553382365, 1.375319777650363 2.0927101020998755, 1.2500000000000002 2.1650635094610964 C1.1246802223496375 2.2374169168223172, 0.9910302842862845 2.2997389064532, 0.8550503583141721 2.349231551964771 C0.7190704323420597 2.3987241974763416, 0.576628837219688 2.436891307857982, 0.43412044416732604 2.46201938253052 C0.291612051114964 2.487147457203058, 0.14470681472244212 2.5, 1.5308084989341916e-16 2.5 C-0.1447068147224418 2.5, -0.2916120511149638 2.487147457203058, -0.43412044416732576 2.46201938253052 C-0.5766288372196877 2.436891307857982, -0.7190704323420595 2.3987241974763416, -0.8550503583141718 2.3492315519647713 C-0.991030284286284 2.299738906453201, -1.124680222349637 2.2374169168223177, -1.2499999999999996 2.165063509461097 C-1.375319777650362 2.092710102099876, -1.4961171729167733 2.008126855338237, -1.6069690242163475 1.9151111077974459 C-1.7178208755159217 1.8220953602566548, -1.822095360256653 1.7178208755159234, -1.9151111077974443 1.6069690242163495 C-2.0081268553382357 1.4961171729167755, -2.0927101020998746 1.3753197776503645, -2.1650635094610955 1.250000000000002 C-2.2374169168223164 1.1246802223496395, -2.2997389064531992 0.9910302842862865, -2.34923155196477 0.8550503583141743 C-2.3987241974763407 0.7190704323420621, -2.436891307857981 0.5766288372196907, -2.4620193825305194 0.434120444167329 C-2.487147457203058 0.29161205111496724, -2.5 0.14470681472244545, -2.5 3.636830773662308e-15 C-2.5 -0.14470681472243818, -2.4871474572030587 -0.2916120511149599, -2.4620193825305208 -0.4341204441673218 C-2.436891307857983 -0.5766288372196837, -2.398724197476343 -0.7190704323420553, -2.3492315519647726 -0.8550503583141675 C-2.2997389064532023 -0.9910302842862798, -2.23741691682232 -1.1246802223496328, -2.165063509461099 -1.2499999999999956 C-2.092710102099878 -1.3753197776503583, -2.00812685533824 -1.4961171729167695, -1.9151111077974488 -1.606969024216344 C-1.8220953602566576 -1.7178208755159183, -1.7178208755159263 -1.82209536025665, -1.6069690242163523 -1.9151111077974416 C-1.4961171729167784 -2.0081268553382334, -1.3753197776503672 -2.0927101020998724, -1.2500000000000047 -2.1650635094610937 C-1.1246802223496422 -2.237416916822315, -0.9910302842862897 -2.299738906453198, -0.8550503583141776 -2.3492315519647686 C-0.7190704323420656 -2.3987241974763394, -0.5766288372196942 -2.4368913078579806, -0.43412044416733236 -2.462019382530519 C-0.29161205111497057 -2.4871474572030574, -0.1447068147224489 -2.4999999999999996, -7.120580697431198e-15 -2.5 C0.14470681472243463 -2.5000000000000004, 0.29161205111495647 -2.487147457203059, 0.4341204441673183 -2.4620193825305217 C0.5766288372196802 -2.436891307857984, 0.7190704323420518 -2.3987241974763442, 0.8550503583141642 -2.349231551964774 C0.9910302842862766 -2.2997389064532037, 1.1246802223496295 -2.2374169168223212, 1.2499999999999925 -2.165063509461101 C1.3753197776503554 -2.0927101020998804, 1.4961171729167668 -2.008126855338242, 1.6069690242163412 -1.915111107797451 C1.7178208755159157 -1.82209536025666, 1.8220953602566472 -1.7178208755159294, 1.915111107797439 -1.6069690242163557 C2.0081268553382308 -1.496117172916782, 2.09271010209987 -1.3753197776503712, 2.1650635094610915 -1.2500000000000089 C2.237416916822313 -1.1246802223496466, 2.299738906453196 -0.9910302842862939, 2.3492315519647673 -0.855050358314182 C2.3987241974763385 -0.71907043234207, 2.4368913078579792 -0.5766288372196986, 2.462019382530518 -0.4341204441673369 C2.487147457203057 -0.29161205111497523, 2.4936698970884197 -0.07235340736123454, 2.5 -1.1714553645825241e-14 C2.5063301029115803 0.07235340736121111, 2.50633010291158 -0.07235340736122292, 2.5 0"></path></g></g></g></g></g></g></svg>'
+    _, node, start, extra = task
 
-    # div_node = BeautifulSoup(f'{svg}', 'html.parser').find('svg')
+    try:
+        _CLOSE_HANDLERS.get(node.name, _close_generic)(node, out, start, extra)
+    
+    except Exception:
+        del out[start:]
+        logger.debug("处理节点错误: %s", node.name, exc_info=True)
+        out.append(f"[ERROR_PROCESSING:{node.name}]")
 
-    # convert_statediagram_svg_to_mermaid_text(div_node)
+def _sanitize_filename(filename: str) -> str:
+    """
+    规范化文件名：替换非法字符，去掉首尾的空格和点，并限制长度
 
-    # return
+    Parameters:
+        filename (str): 原始文件名
 
+    Returns:
+        str: 可安全用于文件系统的文件名
+    """
+    return filename.translate(_SANITIZE_TABLE).strip(' .')[:255] or 'unnamed'
 
+@lru_cache(maxsize=1)
+def _chrome_paths() -> tuple:
+    """
+    通过 Selenium Manager 查找 ChromeDriver 和 Chrome 的路径。查找需要启动外部进程，整个运行期间只做一次
+
+    Returns:
+        tuple: (ChromeDriver 路径, Chrome 路径)
+    """
+    finder = DriverFinder(Service(), Options())
+    return finder.get_driver_path(), finder.get_browser_path()
+
+def create_driver():
+    """
+    创建一个配置好的无头 Chrome 浏览器实例
+
+    Returns:
+        WebDriver: Chrome 浏览器实例
+    """
     # 配置 Chrome 选项 (可选)：例如，无头模式运行
     chrome_options = Options()
     # # 禁用所有日志输出
@@ -751,27 +1081,175 @@ def deepwiki2markdown(url: str, output_path: str):
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-gpu')
     chrome_options.add_argument('--headless')  # 无头模式也会减少输出
+    chrome_options.add_argument('--remote-debugging-pipe')  # 通过管道而非本地 TCP 端口与浏览器通信，启动更快
+    # 不下载图片、样式表和字体：转换只读取 DOM，图表也是内联的 SVG
+    chrome_options.add_experimental_option('prefs', {
+        'profile.managed_default_content_settings.images': 2,
+        'profile.managed_default_content_settings.stylesheets': 2,
+        'profile.managed_default_content_settings.fonts': 2,
+    })
+    # DOM 解析完成即返回，正文是否就绪由之后的显式等待判断
+    chrome_options.page_load_strategy = 'eager'
     # 指定 ChromeDriver 的路径
     # 如果您将 chromedriver 放在系统 PATH 中，则无需指定 service_executable_path
     # service = Service(executable_path='/path/to/your/chromedriver') # 替换为您的chromedriver路径
     # driver = webdriver.Chrome(service=service, options=chrome_options)
     
-    # 如果 chromedriver 在 PATH 中，可以直接这样初始化
-    driver = webdriver.Chrome(options=chrome_options)
+    # 直接使用缓存的路径，每个浏览器实例不再各自调用一次 Selenium Manager。
+    # Service 管理着一个 chromedriver 进程，不能在多个浏览器实例之间共用，每次新建
+    driver_path, browser_path = _chrome_paths()
+    if browser_path:
+        chrome_options.binary_location = browser_path
+    return webdriver.Chrome(service=Service(executable_path=driver_path), options=chrome_options)
+
+def _wait_for_content(driver, url: str):
+    """
+    显式等待页面主内容出现，并等待其中的 Mermaid 图表渲染为 SVG；超时也继续按已加载的内容解析
+
+    Parameters:
+        driver (WebDriver): 已打开页面的浏览器实例
+        url (str): 页面 URL，仅用于提示信息
+
+    Returns:
+        None
+    """
+    # 两次等待共用同一个截止时间，整个页面最多等待 _PAGE_LOAD_TIMEOUT 秒
+    deadline = time.monotonic() + _PAGE_LOAD_TIMEOUT
+    try:
+        WebDriverWait(driver, _PAGE_LOAD_TIMEOUT).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, '.container > div:nth-child(2)'))
+        )
+        # 页面按 eager 策略在 DOM 解析完成时就返回，图表可能还是 Mermaid 源码，转换时会被当成普通代码块
+        WebDriverWait(driver, max(0, deadline - time.monotonic())).until(
+            lambda d: d.execute_script(_MERMAID_RENDERED_JS)
+        )
+    except TimeoutException:
+        printf(f"等待页面超时: {url}")
+
+def _save_page(url: str, page_source: str, filename: str, page_dir: str):
+    """
+    把已加载的 Deepwiki 页面源码转换为 Markdown 并保存
+
+    Parameters:
+        url (str): 页面 URL，仅用于提示信息
+        page_source (str): 页面 HTML 源码
+        filename (str): 页面标题，用作 Markdown 文件名
+        page_dir (str): Markdown 文件的保存目录
+
+    Returns:
+        None
+    """
+    try:
+        # 主内容
+        soup = BeautifulSoup(page_source, 'lxml', parse_only=_CONTENT_STRAINER)
+        content = soup.select_one(".container > div:nth-child(2) .prose") or \
+                soup.select_one(".container > div:nth-child(2) .prose-custom") or \
+                soup.select_one(".container > div:nth-child(2)") or \
+                BeautifulSoup(page_source, 'lxml').body
+        
+        # 隐藏元素和不需要的元素在转换前整棵移除，遍历时不会再进入这些子树
+        for element in _SEL_SKIPPED.select(content):
+            element.decompose()
+
+        out = []
+        for child in content.children:
+            process_node(child, out)
+        markdown = ''.join(out)
+        markdown = _BLANKS_RE.sub('\n\n', markdown.strip())
+        
+        md_path = os.path.join(page_dir, f"{_sanitize_filename(filename)}.md")
+        # 一次编码后以二进制整体写入临时文件，再原子替换，避免并发抓取时留下写了一半的文件
+        tmp_path = f"{md_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(markdown.encode('utf-8'))
+        os.replace(tmp_path, md_path)
+        printf(f"保存: {md_path}")
+    except Exception as e:
+        printf(f"处理页面 {url} 出错: {e}")
+
+def _process_page(url: str, filename: str, page_dir: str, drivers: list, pool: ProcessPoolExecutor):
+    """
+    抓取单个 Deepwiki 页面，再交给进程池转换为 Markdown 文件。每个工作线程复用自己的浏览器实例
+
+    Parameters:
+        url (str): 页面 URL
+        filename (str): 页面标题，用作 Markdown 文件名
+        page_dir (str): Markdown 文件的保存目录
+        drivers (list): 记录新创建的浏览器实例，便于结束后统一关闭
+        pool (ProcessPoolExecutor): 执行页面转换的进程池
+
+    Returns:
+        Future: 页面转换任务，抓取失败时为 None
+    """
+    driver = getattr(_thread_local, 'driver', None)
+    if driver is None:
+        driver = create_driver()
+        _thread_local.driver = driver
+        drivers.append(driver)
 
     try:
+        printf(f"提取: {url}")
         # 打开网页
         driver.get(url)
+        _wait_for_content(driver, url)
+        page_source = driver.page_source
+    except Exception as e:
+        printf(f"处理页面 {url} 出错: {e}")
+        return None
 
-        # 等待页面加载完成 (可选，根据页面复杂度调整)。可以使用显式等待来等待某个元素出现，或者简单地等待几秒
-        time.sleep(3) # 简单等待3秒，确保页面内容加载
+    # 解析和转换是纯 CPU 计算，放到其他进程中执行才能不受 GIL 限制；当前线程随即去抓取下一个页面
+    return pool.submit(_save_page, url, page_source, filename, page_dir)
+
+def create_pool():
+    """
+    创建转换页面用的进程池。批量处理多个 URL 时由调用者创建一次并复用，避免反复启动解释器，
+    也让各进程内的图表转换缓存在整次运行中保持有效
+
+    Returns:
+        ProcessPoolExecutor: 进程池
+    """
+    return ProcessPoolExecutor(max_workers=_MAX_CONVERT_WORKERS)
+
+def deepwiki2markdown(url: str, output_path: str, driver=None, pool=None):
+    """
+    解析 Deepwiki 的 URL 页面内容，并转为 Markdown 文件
+
+    Parameters:
+        url (str): Deepwiki 的 URL
+        output_path (str): 转换后 Markdown 文档的保存路径
+        driver (WebDriver): 用于打开目录页的浏览器实例，批量处理多个 URL 时可由调用者复用；为 None 时自动创建并在结束后关闭
+        pool (ProcessPoolExecutor): 转换页面的进程池，由 create_pool 创建，可由调用者复用；为 None 时自动创建并在结束后关闭
+
+    Returns:
+        None
+    """
+    own_driver = driver is None
+    if own_driver:
+        driver = create_driver()
+    own_pool = pool is None
+    if own_pool:
+        pool = create_pool()
+    drivers = []
+
+    try:
+        # 打开网页
+        driver.get(url)
+
+        # 显式等待侧边栏中的目录链接出现，页面就绪后立即继续，而不是固定等待几秒
+        WebDriverWait(driver, _PAGE_LOAD_TIMEOUT).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, '.border-r-border ul a'))
+        )
 
         # 一个 URL 对应多个篇文章，我们用一个目录存放
-        pdir = url.split('/')[-1]
-        os.makedirs(f"{output_path}/{pdir}", exist_ok=True)
+        page_dir = os.path.join(output_path, url.rpartition('/')[2])
+        os.makedirs(page_dir, exist_ok=True)
+
+        # 第一个目录项与基础 URL 实际是同一个页面：等正文也加载完成，之后直接复用这份页面源码
+        _wait_for_content(driver, url)
+        index_source = driver.page_source
 
         # 获取侧边栏目录，每一个目录项都是一个页面，我们需要依次处理
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        soup = BeautifulSoup(index_source, 'lxml', parse_only=_SIDEBAR_STRAINER)
         sidebar = soup.select_one('.border-r-border')
         ul_elements = sidebar.find_all('ul')
         urls = []
@@ -786,37 +1264,61 @@ def deepwiki2markdown(url: str, output_path: str):
                     href = a_element.get('href')
                     text = a_element.get_text(strip=True)
                     filenames.append(text)
-                    urls.append(url + '/' + href.split('/')[-1])
-        # 开始处理当前 URL 下所有页面（其中，第一个目录与基础 URL 实际是一个页面）
-        for url, filename in zip(urls, filenames):
-            printf(f"提取: {url}")
-            # 打开网页
-            driver.get(url)
-
-            # 等待页面加载完成 (可选，根据页面复杂度调整)。可以使用显式等待来等待某个元素出现，或者简单地等待几秒
-            time.sleep(3) # 简单等待3秒，确保页面内容加载
-            
-            # 主内容
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            content = soup.select_one(".container > div:nth-child(2) .prose") or \
-                    soup.select_one(".container > div:nth-child(2) .prose-custom") or \
-                    soup.select_one(".container > div:nth-child(2)") or \
-                    soup.body
-            
-            markdown = ''.join(process_node(child) for child in content.children)
-            markdown = re.sub(r'\n{3,}', '\n\n', markdown.strip())
-            
-            # 用于规范化文件名。示例：txt = sanitize(txt)
-            sanitize = lambda f: re.sub(r'[<>:"/\\|?*\x00-\x1f]', '_', f).strip(' .')[:255] or 'unnamed'
-            filename_f = sanitize(filename)
-            markdown_name = f"{filename_f}.md"
-            md_path = os.path.join(f"{output_path}/{pdir}", markdown_name)
-            with open(md_path, 'w', encoding='utf-8') as f:
-                f.write(markdown)
-            printf(f"保存: {md_path}")
+                    urls.append(url + '/' + href.rpartition('/')[2])
+        # 开始处理当前 URL 下所有页面（其中，第一个目录与基础 URL 实际是一个页面，无需再次打开）
+        # 各页面互不依赖，由多个浏览器实例并发抓取，抓到的页面源码交给进程池并行转换
+        workers = max(1, min(len(urls) - 1, _MAX_WORKERS))
+        futures = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            if urls:
+                futures.append(pool.submit(_save_page, urls[0], index_source, filenames[0], page_dir))
+            futures.extend(executor.map(
+                _process_page, urls[1:], filenames[1:], repeat(page_dir), repeat(drivers), repeat(pool)
+            ))
+
+        # 等待所有页面转换完成；转换进程崩溃或进程池损坏时页面会丢失，必须报告出来
+        for page_url, future in zip(urls, futures):
+            if future is None:
+                continue
+            try:
+                future.result()
+            except Exception as e:
+                printf(f"处理页面 {page_url} 出错: {e}")
     except Exception as e:
         printf(f"An error occurred: {e}")
     finally:
         # 关闭浏览器
-        if driver:
+        for worker_driver in drivers:
+            worker_driver.quit()
+        if own_driver:
             driver.quit()
+        if own_pool:
+            pool.shutdown()
+
+@lru_cache(maxsize=None)
+def _sample_svg(name: str) -> str:
+    """
+    读取 samples 目录下的示例 SVG，仅供调试使用。首次调用时才读取文件，之后直接返回缓存的内容
+
+    Parameters:
+        name (str): 示例文件名（不含扩展名）
+
+    Returns:
+        str: SVG 文本
+    """
+    with open(os.path.join(os.path.dirname(__file__), 'samples', f'{name}.svg'), encoding='utf-8') as f:
+        return f.read()
+
+if __name__ == "__main__":
+    # 调试图表转换：python -m code.deepwiki2markdown [SVG 文件]，默认使用 samples 目录下的状态图示例
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding='utf-8') as f:
+            svg_text = f.read()
+    else:
+        svg_text = _sample_svg('statediagram')
+    svg_element = BeautifulSoup(svg_text, 'lxml').find('svg')
+    diagram_type = svg_element.get('aria-roledescription', '')
+    for keyword, converter in _DIAGRAM_CONVERTERS.items():
+        if keyword in diagram_type:
+            printf(converter(svg_element))
+            break
@@ -1,15 +1,85 @@
 #!/usr/bin/env python3
 import os
 import re
+import json
+import shutil
+import hashlib
 import pandas as pd
 import pypandoc
-from code.deepwiki2markdown import deepwiki2markdown
+from code.deepwiki2markdown import deepwiki2markdown, create_driver, create_pool
 from code.translationmarkdown import MarkdownTranslator
 from code.printf import printf
 
 # 定义 DeepSeek API 密钥
 DEEPSEEK_API_KEY = ''
 
+# Word 文档按 Markdown 内容、引用的本地图片以及 pandoc 和 mermaid-filter 的版本做 SHA256 缓存：
+# 这些都未变化的文档直接复用，不再启动 pandoc 和 mermaid-filter 重新渲染图表。
+# 设置 WORD_CACHE_ENABLED = False 可跳过缓存；需要清空缓存时直接删除 WORD_CACHE_DIR 目录
+WORD_CACHE_ENABLED = True
+WORD_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'wp_md_wd', 'docx')
+
+# Markdown 中的图片引用：![说明](路径)
+IMAGE_LINK_PATTERN = re.compile(r'!\[[^\]]*\]\(\s*<?([^)\s>]+)')
+
+def mermaid_filter_version(mermaid_filter):
+    """
+    查找 mermaid-filter 的版本号：从可执行文件所在位置找到 npm 包的 package.json
+
+    Parameters:
+        mermaid_filter (str): mermaid-filter 的命令名
+
+    Returns:
+        str: 版本号，找不到 package.json 时退化为可执行文件的修改时间，找不到命令时为空字符串
+    """
+    command = shutil.which(mermaid_filter)
+    if not command:
+        return ''
+    # Linux/macOS 下命令是指向包内脚本的符号链接；Windows 下 .cmd 与 node_modules 目录同级
+    script = os.path.realpath(command)
+    candidates = [os.path.join(os.path.dirname(command), 'node_modules', 'mermaid-filter')]
+    directory = os.path.dirname(script)
+    for _ in range(3):
+        candidates.append(directory)
+        directory = os.path.dirname(directory)
+    for directory in candidates:
+        try:
+            with open(os.path.join(directory, 'package.json'), encoding='utf-8') as f:
+                package = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if package.get('name') == 'mermaid-filter':
+            return package.get('version', '')
+    return str(os.path.getmtime(script))
+
+def word_cache_key(src_path, tool_versions):
+    """
+    计算 Word 缓存的键：Markdown 内容、其中引用的本地图片内容以及转换工具的版本
+
+    Parameters:
+        src_path (str): Markdown 文件路径
+        tool_versions (str): pandoc 和 mermaid-filter 的版本信息
+
+    Returns:
+        str: 十六进制的 SHA256 摘要
+    """
+    digest = hashlib.sha256(tool_versions.encode('utf-8') + b'\n')
+    with open(src_path, 'rb') as f:
+        markdown_bytes = f.read()
+    digest.update(markdown_bytes)
+    src_dir = os.path.dirname(src_path)
+    for link in IMAGE_LINK_PATTERN.findall(markdown_bytes.decode('utf-8', errors='replace')):
+        # 远程图片和内联图片已包含在 Markdown 内容中，只需要读取本地文件
+        if re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*://|^data:', link):
+            continue
+        digest.update(b'\0' + link.encode('utf-8') + b'\0')
+        try:
+            with open(os.path.join(src_dir, link), 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b'missing')
+    return digest.hexdigest()
+
 def main():
     printf(">>> DeepWiki 页面 ➜  Markdown ➜  翻译 ➜  Word <<<")
     
@@ -31,10 +101,17 @@ def main():
     
     printf(f"\n开始依次提取 URL 页面内容...")
     markdown_num = 0
-    for url in urls:
-        printf(f"提取: {url}")
-        deepwiki2markdown(url, 'data/files_markdown')
-        markdown_num += 1
+    # 所有 URL 共用一个浏览器实例打开目录页、共用一个进程池转换页面，避免每个 URL 都重新启动浏览器和进程
+    driver = create_driver()
+    pool = create_pool()
+    try:
+        for url in urls:
+            printf(f"提取: {url}")
+            deepwiki2markdown(url, 'data/files_markdown', driver, pool)
+            markdown_num += 1
+    finally:
+        driver.quit()
+        pool.shutdown()
     printf(f"成功提取 {markdown_num} 个 URL 页面内容！")
     
     printf(f"\n开始翻译 Markdown 文件...")
@@ -65,6 +142,14 @@ def main():
 
     printf(f"\n开始转换为 Word 文档...")
     word_num = 0
+    if os.name == 'nt':
+        mermaid_filter = 'mermaid-filter.cmd'
+    else:
+        mermaid_filter = 'mermaid-filter'
+    # 工具版本计入缓存键，升级 pandoc 或 mermaid-filter 后旧的缓存不再命中
+    tool_versions = ''
+    if WORD_CACHE_ENABLED:
+        tool_versions = f"pandoc {pypandoc.get_pandoc_version()}\n{mermaid_filter} {mermaid_filter_version(mermaid_filter)}"
     for root, _, files in os.walk('data/files_markdown_translated'):
         for file in files:
             if file.endswith('.md'):
@@ -79,11 +164,22 @@ def main():
                 
                 printf(f"转换: {src_path}")
                 dst_path = dst_path.removesuffix('.md').removesuffix('.markdown') + '.docx' if dst_path.endswith(('.md', '.markdown')) else dst_path
-                if os.name == 'nt':
-                    mermaid_filter = 'mermaid-filter.cmd'
+                cached_path = None
+                if WORD_CACHE_ENABLED:
+                    cached_path = os.path.join(WORD_CACHE_DIR, f'{word_cache_key(src_path, tool_versions)}.docx')
+                if cached_path and os.path.exists(cached_path):
+                    shutil.copyfile(cached_path, dst_path)
                 else:
-                    mermaid_filter = 'mermaid-filter'
-                pypandoc.convert_file(src_path, 'docx', outputfile=dst_path, filters=mermaid_filter, format='markdown')
+                    pypandoc.convert_file(src_path, 'docx', outputfile=dst_path, filters=mermaid_filter, format='markdown')
+                    # 先写临时文件再原子替换；缓存目录不可写时只提示，不影响转换结果
+                    if cached_path:
+                        try:
+                            os.makedirs(WORD_CACHE_DIR, exist_ok=True)
+                            tmp_path = f'{cached_path}.{os.getpid()}.tmp'
+                            shutil.copyfile(dst_path, tmp_path)
+                            os.replace(tmp_path, cached_path)
+                        except OSError as e:
+                            printf(f"写入 Word 缓存出错: {e}")
                 printf(f"保存: {dst_path}")
                 word_num += 1
     printf(f"成功转换 {word_num} 个 Word 文件！")
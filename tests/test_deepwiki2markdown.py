@@ -0,0 +1,46 @@
+import unittest
+
+from bs4 import BeautifulSoup
+
+from code.deepwiki2markdown import detect_code_language, process_node
+
+
+class DetectCodeLanguageTest(unittest.TestCase):
+    """YAML/JSON 的键名与各语言关键字同名时，不能因此被识别为对应语言"""
+
+    def test_yaml_keys_named_like_keywords(self):
+        self.assertEqual(detect_code_language('apiVersion: v1\nkind: ConfigMap\nmetadata:\n  namespace: default'), 'yaml')
+        self.assertEqual(detect_code_language('name: demo\npackage: foo'), 'yaml')
+        self.assertEqual(detect_code_language('from: alice\nto: bob'), 'yaml')
+
+    def test_json_keys_named_like_keywords(self):
+        self.assertNotEqual(detect_code_language('{"function": 1, "namespace": 2}'), 'javascript')
+        self.assertEqual(detect_code_language('["function", "namespace", "package", "from"]'), 'json')
+
+    def test_long_json_array(self):
+        # 整段代码参与识别，超长的 JSON 不会因截断而识别失败
+        self.assertEqual(detect_code_language('[' + ', '.join(map(str, range(400))) + ']'), 'json')
+
+
+class TableTest(unittest.TestCase):
+    """表格只取自身的行和单元格，嵌套表格的内容留在所在单元格中"""
+
+    def convert(self, html):
+        out = []
+        process_node(BeautifulSoup(html, 'lxml').table, out)
+        return ''.join(out)
+
+    def test_rows_inside_sections(self):
+        html = ('<table><thead><tr><th>h1</th><th>h|2</th></tr></thead>'
+                '<tbody><tr><td>a</td><td>b</td></tr></tbody></table>')
+        self.assertEqual(self.convert(html), '|h1|h\\|2|\n| --- | --- |\n|a|b|\n\n')
+
+    def test_nested_table(self):
+        html = ('<table><tr><th>h1</th><th>h2</th></tr>'
+                '<tr><td>a<table><tr><td>nested</td><td>nested</td></tr><tr><td>nested</td></tr></table></td>'
+                '<td>b</td></tr></table>')
+        self.assertEqual(self.convert(html), '|h1|h2|\n| --- | --- |\n|anestednestednested|b|\n\n')
+
+
+if __name__ == '__main__':
+    unittest.main()